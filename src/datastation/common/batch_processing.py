@@ -1,8 +1,25 @@
 import logging
 import os
+import signal
+import sys
+import threading
 import time
+from concurrent import futures
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
+from datastation.common.batch_progress import BatchProgress
+from datastation.common.batch_stats import BatchStats
+from datastation.common.circuit_breaker import get_circuit_breakers_wait_time, are_circuit_breakers_closed
 from datastation.common.csv import CsvReport
+from datastation.common.entries import EntryStream, FailedEntriesFile
+from datastation.common.http_session import deadline
+from datastation.common.journal import Journal, get_entry_key
+from datastation.common.retry import RetryPolicy
+from datastation.common.throttle import create_throttle
+
+# Signals on which a batch run stops taking new entries, but finishes the entries in progress
+STOP_SIGNALS = [signal.SIGINT, signal.SIGTERM]
 
 
 def get_pids(pid_or_pids_file):
@@ -15,26 +32,44 @@ def get_entries(entries):
 
     Args:
         entries: A string (e.g. a dataset PID or dataverse alias),
-                 or a plain text file with a string per line
+                 or a plain text file with a string per line, which may be gzip or zstd compressed,
+                 or - for a list of strings on stdin
 
-    Returns: a list with strings
+    Returns: a list with the string, or an EntryStream that lazily reads the file, skipping blank lines, comment lines
+             and duplicates
     """
     if entries is None:
         return []
-    elif os.path.isfile(os.path.expanduser(entries)):
-        objects = []
-        with open(os.path.expanduser(entries)) as f:
-            for line in f:
-                objects.append(line.strip())
-        return objects
+    elif entries == '-' or os.path.isfile(os.path.expanduser(entries)):
+        return EntryStream(os.path.expanduser(entries))
     else:
         return [entries]
 
 
 class BatchProcessor:
-    def __init__(self, wait=0.1, fail_on_first_error=True):
+    def __init__(self, wait=0.1, fail_on_first_error=True, parallel=1, rate=None, adaptive=False, throttle=None,
+                 max_attempts=1, retry_policy=None, progress=False, max_duration=None,
+                 failed_out=None, entry_timeout=None):
         self.wait = wait
         self.fail_on_first_error = fail_on_first_error
+        self.parallel = parallel
+        self.throttle = throttle if throttle is not None else create_throttle(wait, rate, adaptive)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(max_attempts)
+        self.current_attempt = threading.local()
+        self.stats = BatchStats()
+        self.progress = progress
+        self.batch_progress = None
+        self.journal = None
+        self.num_skipped = 0
+        self.num_not_started = 0
+        self.not_started_lock = threading.Lock()
+        self.probe_lock = threading.Lock()
+        self.max_duration = max_duration
+        self.deadline = None
+        self.stop_requested = threading.Event()
+        self.failed_out = failed_out
+        self.failed_entries = None
+        self.entry_timeout = entry_timeout
 
     def process_pids(self, entries, callback):
         """ kept for backward compatibility"""
@@ -51,59 +86,349 @@ class BatchProcessor:
 
         If an entry is a string or a dictionary with key 'PID',
         the value is used for progress logging.
+
+        Before each entry the throttle decides how long to wait: a fixed wait between entries, a target rate (entries
+        per second) or, in adaptive mode, a rate that is lowered when the server is overloaded.
+
+        An entry whose callback raises an exception that the retry policy classifies as transient (e.g. a connection
+        error or a 5xx response) is retried after an exponentially growing delay, up to the maximum number of attempts.
+
+        While the circuit breaker of any HTTP session is open, because the server is failing, no new entries are
+        started. After its cool-down, a single entry is started to probe the server; the others wait until that entry
+        is done, and only if the circuit breakers are closed again do they start at full speed.
+
+        If entry_timeout is set, each attempt has that many seconds for its HTTP requests: their timeouts are cut to
+        the time left, and once it has run out, a request raises a timeout instead of being sent.
+
+        The latency of each callback, the throughput and the error rate are collected in stats. If more than one entry
+        was processed, a summary is printed to stderr at the end.
+
+        With progress=True, a live progress display on stderr replaces the logging of each entry.
+
+        If failed_out is set, each entry that fails is written to that file, in a format that can be used as input for
+        a new run; see FailedEntriesFile.
+
+        If a journal is set, the outcome of each entry is recorded in it, and entries that the journal reports as done
+        are skipped.
+
+        If parallel is larger than 1, the callbacks are run on a pool of that many worker threads. At most twice that
+        number of entries is read ahead of the workers, so a lazy stream of entries is not exhausted up front.
+
+        On SIGINT or SIGTERM, after max_duration seconds, or when request_stop is called, no new entries are taken and
+        failed entries are not retried, but the entries in progress are finished. A second signal is handled as
+        usual, e.g. a second Ctrl-C raises KeyboardInterrupt.
         """
         if entries is None:
             logging.info("Nothing to process")
             return
         elif type(entries) is list:
             num_entries = len(entries)
-            logging.info(f"Start batch processing on {num_entries} entries")
+        elif type(entries) is EntryStream and entries.count() is not None:
+            num_entries = entries.count()
         else:
-            logging.info(f"Start batch processing on unknown number of entries")
             num_entries = -1
+        if num_entries == -1:
+            logging.info(f"Start batch processing on unknown number of entries")
+        else:
+            logging.info(f"Start batch processing on {num_entries} entries")
+        self.num_skipped = 0
+        self.stats = BatchStats()
+        self.stop_requested = threading.Event()
+        self.deadline = time.monotonic() + self.max_duration if self.max_duration is not None else None
+        if self.failed_out is not None:
+            self.failed_entries = FailedEntriesFile(os.path.expanduser(self.failed_out))
+            self.failed_entries.open()
+        if self.progress:
+            self.batch_progress = BatchProgress()
+            self.batch_progress.start_batch(total=num_entries if num_entries != -1 else None)
+        try:
+            with self._stop_on_signals():
+                if self.parallel > 1:
+                    i = self._process_entries_concurrently(entries, callback, num_entries)
+                else:
+                    i = self._process_entries_sequentially(entries, callback, num_entries)
+        finally:
+            if self.batch_progress is not None:
+                self.batch_progress.stop()
+                self.batch_progress = None
+            if self.failed_entries is not None:
+                self.failed_entries.close()
+                logging.info(f"Wrote {self.failed_entries.num_entries} failed entries to {self.failed_out}")
+                self.failed_entries = None
+        if self.num_skipped > 0:
+            logging.info(f"Skipped {self.num_skipped} entries that were already done")
+        if self.stop_requested.is_set():
+            logging.info(f"Batch processing stopped early: {i} entries processed")
+        else:
+            logging.info(f"Batch processing ended: {i} entries processed")
+        if self.stats.num_processed > 1:
+            print(self.stats.get_summary(), file=sys.stderr)
+
+    def _process_entries_sequentially(self, entries, callback, num_entries):
         i = 0
         for obj in entries:
+            if self._should_stop():
+                break
             i += 1
+            if self._is_done(i, obj):
+                continue
+            self._wait_for_circuit_breakers()
+            self.throttle.before_entry(i)
+            if not self._process_entry(i, num_entries, obj, callback) and self.fail_on_first_error:
+                break
+        return i
+
+    def _process_entries_concurrently(self, entries, callback, num_entries):
+        logging.info(f"Processing entries on {self.parallel} workers")
+        i = 0
+        failed = False
+        pending = set()
+        self.num_not_started = 0
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            for obj in entries:
+                if len(pending) >= 2 * self.parallel:
+                    done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    failed = any(future.result() is False for future in done)
+                    if failed and self.fail_on_first_error:
+                        break
+                if self._should_stop():
+                    break
+                i += 1
+                if self._is_done(i, obj):
+                    continue
+                self._wait_for_circuit_breakers()
+                self.throttle.before_entry(i)
+                pending.add(executor.submit(self._start_entry, i, num_entries, obj, callback))
+            if self.fail_on_first_error and not failed and not self.stop_requested.is_set():
+                for future in futures.as_completed(pending):
+                    if future.result() is False:
+                        failed = True
+                        break
+            if (failed and self.fail_on_first_error) or self.stop_requested.is_set():
+                cancelled = [future for future in pending if future.cancel()]
+                i -= len(cancelled)
+                logging.debug(f"Cancelled {len(cancelled)} pending entries")
+        # entries that were still waiting for a worker when a stop was requested
+        return i - self.num_not_started
+
+    def _start_entry(self, i, num_entries, obj, callback):
+        """ Processes the entry on a worker, unless a stop was requested while the entry was waiting for the worker.
+        Returns None if the entry was not started, otherwise the result of _process_entry. """
+        with self.probe_lock:
+            self._wait_for_circuit_breakers()
+            if self._should_stop():
+                with self.not_started_lock:
+                    self.num_not_started += 1
+                return None
+            if not are_circuit_breakers_closed():
+                # this entry probes the server; the other workers wait for the lock until it is done
+                return self._process_entry(i, num_entries, obj, callback)
+        return self._process_entry(i, num_entries, obj, callback)
+
+    def request_stop(self, reason):
+        """ Stops taking new entries; the entries in progress are finished. May be called from any thread. """
+        if not self.stop_requested.is_set():
+            logging.warning(f"Stopping batch processing ({reason}), finishing the entries in progress")
+            self.stop_requested.set()
+
+    def _should_stop(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.request_stop(f"maximum duration of {self.max_duration} seconds reached")
+        return self.stop_requested.is_set()
+
+    @contextmanager
+    def _stop_on_signals(self):
+        # signal handlers can only be installed from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+        previous_handlers = {signum: signal.getsignal(signum) for signum in STOP_SIGNALS}
+
+        def restore_handlers():
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler if handler is not None else signal.SIG_DFL)
+
+        def handle_signal(signum, frame):
+            restore_handlers()
+            self.request_stop(f"received {signal.Signals(signum).name}")
+
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, handle_signal)
+        try:
+            yield
+        finally:
+            restore_handlers()
+
+    def _wait_for_circuit_breakers(self):
+        wait_time = get_circuit_breakers_wait_time()
+        if wait_time > 1:
+            logging.warning(f"Pausing batch processing for {wait_time:.0f} seconds, until the circuit breaker closes")
+        while wait_time > 0 and not self.stop_requested.wait(min(wait_time, 1.0)):
+            wait_time = get_circuit_breakers_wait_time()
+
+    def _is_done(self, i, obj):
+        if self.journal is not None and self.journal.is_done(obj):
+            logging.debug(f"Skipping entry nr {i}, it was already done")
+            self.num_skipped += 1
+            if self.batch_progress is not None:
+                self.batch_progress.entry_skipped()
+            return True
+        return False
+
+    def _process_entry(self, i, num_entries, obj, callback):
+        """ Calls the callback for a single entry, retrying as far as the retry policy allows. Returns False if the
+        last attempt raised an exception. """
+        if self.batch_progress is not None:
+            self.batch_progress.entry_started(i, obj)
+        else:
+            self._log_progress(i, num_entries, obj)
+        attempt = 1
+        while True:
+            start_time = time.monotonic()
             try:
-                if self.wait > 0 and i > 1:
-                    logging.debug(f"Waiting {self.wait} seconds before processing next entry")
-                    time.sleep(self.wait)
-                if num_entries > 1:
-                    progress_message = f"Processing {i} of {num_entries} entries"
-                elif num_entries == -1:
-                    progress_message = f"Processing entry number {i}"
-                else:
-                    progress_message = None
-                if progress_message is not None:
-                    if type(obj) is str:
-                        logging.info(f"{progress_message}: {obj}")
-                    elif type(obj) is dict and 'PID' in obj.keys():
-                        logging.info(f"{progress_message}: {obj['PID']}")
-                    else:
-                        logging.info(progress_message)
-                callback(obj)
+                self.current_attempt.number = attempt
+                self.current_attempt.start_time = start_time
+                with deadline(self.entry_timeout):
+                    callback(obj)
+                latency = time.monotonic() - start_time
+                self.throttle.record(latency)
+                self.stats.record_latency(latency)
+                self.stats.record_entry(succeeded=True)
+                if self.batch_progress is not None:
+                    self.batch_progress.entry_finished(i, succeeded=True)
+                if self.journal is not None:
+                    self.journal.record(obj)
+                return True
             except Exception as e:
+                latency = time.monotonic() - start_time
+                self.throttle.record(latency, e)
+                self.stats.record_latency(latency)
+                self._on_failed_attempt(obj, attempt, e)
+                if self.retry_policy.should_retry(e, attempt) and not self._should_stop():
+                    delay = self.retry_policy.get_delay(attempt)
+                    logging.warning(f"Attempt {attempt} of {self.retry_policy.max_attempts} failed on entry nr {i}: "
+                                    f"{e}; retrying in {delay:.1f} seconds")
+                    # a stop request cuts the delay short, in which case the entry is not retried
+                    if not self.stop_requested.wait(delay):
+                        attempt += 1
+                        continue
+                self.stats.record_entry(succeeded=False)
+                if self.batch_progress is not None:
+                    self.batch_progress.entry_finished(i, succeeded=False)
+                if self.journal is not None:
+                    self.journal.record(obj, f"FAILED: {e}")
+                if self.failed_entries is not None:
+                    self.failed_entries.add(obj)
                 logging.exception(f"Exception occurred on entry nr {i}", exc_info=True)
                 if self.fail_on_first_error:
                     logging.error(f"Stop processing because of an exception: {e}")
-                    break
-                logging.debug("fail_on_first_error is False, continuing...")
-        logging.info(f"Batch processing ended: {i} entries processed")
+                else:
+                    logging.debug("fail_on_first_error is False, continuing...")
+                return False
+
+    @staticmethod
+    def _log_progress(i, num_entries, obj):
+        if num_entries > 1:
+            progress_message = f"Processing {i} of {num_entries} entries"
+        elif num_entries == -1:
+            progress_message = f"Processing entry number {i}"
+        else:
+            progress_message = None
+        if progress_message is not None:
+            if type(obj) is str:
+                logging.info(f"{progress_message}: {obj}")
+            elif type(obj) is dict and 'PID' in obj.keys():
+                logging.info(f"{progress_message}: {obj['PID']}")
+            else:
+                logging.info(progress_message)
+
+    def _on_failed_attempt(self, obj, attempt, exception):
+        pass
+
+
+class EntryReport:
+    """ Adds the number of the current attempt and/or the time elapsed since the start of the attempt to the rows
+    written to a CsvReport. """
+
+    def __init__(self, csv_report, attempt=None, start_time=None):
+        self.csv_report = csv_report
+        self.attempt = attempt
+        self.start_time = start_time
+
+    def write(self, row):
+        row = dict(row)
+        if self.attempt is not None:
+            row['Attempt'] = self.attempt
+        if self.start_time is not None:
+            row['Duration'] = f"{time.monotonic() - self.start_time:.3f}"
+        self.csv_report.write(row)
 
 
 class BatchProcessorWithReport(BatchProcessor):
+    """ A batch processor that passes a CsvReport to the callback, in addition to the entry.
+
+    If entries may be attempted more than once, the report gets the extra columns 'Attempt' and 'Error'. The rows that
+    the callback writes get the number of the attempt, and for each failed attempt a row with the entry, the attempt
+    and the error is added.
+
+    With report_durations=True, the report gets the extra column 'Duration', with the number of seconds from the start
+    of the attempt until the row was written.
 
-    def __init__(self, report_file=None, headers=None, wait=0.1, fail_on_first_error=True):
-        super().__init__(wait, fail_on_first_error)
+    Unless the report is written to stdout, the finished entries are also recorded in a journal next to the report
+    file (or in journal_file, if given). With resume=True, the entries that the journal reports as done are skipped and
+    the report is appended to instead of overwritten.
+    """
+
+    def __init__(self, report_file=None, headers=None, wait=0.1, fail_on_first_error=True, parallel=1, rate=None,
+                 adaptive=False, throttle=None, journal_file=None, resume=False, max_attempts=1, retry_policy=None,
+                 report_durations=False, progress=False, max_duration=None, failed_out=None, entry_timeout=None):
+        super().__init__(wait, fail_on_first_error, parallel, rate, adaptive, throttle, max_attempts, retry_policy,
+                         progress, max_duration, failed_out, entry_timeout)
         if headers is None:
             headers = ["DOI", "Modified", "Change"]
+        if self.retry_policy.max_attempts > 1:
+            headers = headers + ['Attempt', 'Error']
+        if report_durations:
+            headers = headers + ['Duration']
         self.report_file = report_file
         self.headers = headers
+        if journal_file is None and report_file is not None and report_file != '-':
+            journal_file = f"{report_file}.journal"
+        if resume and journal_file is None:
+            raise ValueError("Cannot resume without a journal file")
+        self.journal_file = journal_file
+        self.resume = resume
+        self.report_durations = report_durations
+        self.csv_report = None
 
     def process_pids(self, entries, callback):
         """ kept for backward compatibility"""
         return self.process_entries(entries, callback)
 
     def process_entries(self, entries, callback):
-        with CsvReport(os.path.expanduser(self.report_file), self.headers) as csv_report:
-            super().process_entries(entries, lambda entry: callback(entry, csv_report))
+        with CsvReport(os.path.expanduser(self.report_file), self.headers, append=self.resume) as csv_report:
+            self.csv_report = csv_report
+            report_callback = lambda entry: callback(entry, self._get_entry_report(csv_report))
+            try:
+                if self.journal_file is None:
+                    super().process_entries(entries, report_callback)
+                else:
+                    with Journal(os.path.expanduser(self.journal_file), resume=self.resume) as journal:
+                        self.journal = journal
+                        super().process_entries(entries, report_callback)
+            finally:
+                self.journal = None
+                self.csv_report = None
+        if self.stop_requested.is_set() and self.journal_file is not None:
+            logging.info(f"Run again with --resume to process the remaining entries")
+
+    def _get_entry_report(self, csv_report):
+        if self.retry_policy.max_attempts == 1 and not self.report_durations:
+            return csv_report
+        return EntryReport(csv_report,
+                           attempt=self.current_attempt.number if self.retry_policy.max_attempts > 1 else None,
+                           start_time=self.current_attempt.start_time if self.report_durations else None)
+
+    def _on_failed_attempt(self, obj, attempt, exception):
+        if self.retry_policy.max_attempts > 1:
+            self._get_entry_report(self.csv_report).write({self.headers[0]: get_entry_key(obj), 'Error': str(exception)})
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from rich.console import Console
+from rich.progress import Progress, ProgressColumn, BarColumn, MofNCompleteColumn, TextColumn, TimeRemainingColumn, \
+    TimeElapsedColumn
+from rich.table import Table
+from rich.text import Text
+
+from datastation.common.journal import get_entry_key
+
+
+class ThroughputColumn(ProgressColumn):
+    """ Renders the number of entries processed per second. """
+
+    def render(self, task):
+        speed = task.finished_speed or task.speed
+        return Text("?/s" if speed is None else f"{speed:.2f}/s", style="progress.data.speed")
+
+
+class BatchProgress(Progress):
+    """ A live display of the progress of a batch run on stderr: a progress bar with the throughput, the estimated time
+    remaining and the number of succeeded and failed entries, and below it the entries that have been in progress the
+    longest. May be updated from multiple threads. What the entries print to stdout is not redirected to the display,
+    so that it can still be piped into a file. """
+
+    def __init__(self, console=None, num_slowest=5):
+        # set before initializing Progress, which may already render the display
+        self.num_slowest = num_slowest
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        self.task_id = None
+        self.num_succeeded = 0
+        self.num_failed = 0
+        super().__init__(TextColumn("[progress.description]{task.description}"),
+                         BarColumn(),
+                         MofNCompleteColumn(),
+                         ThroughputColumn(),
+                         TimeElapsedColumn(),
+                         TextColumn("ETA"),
+                         TimeRemainingColumn(),
+                         TextColumn("[green]{task.fields[succeeded]} ok[/] [red]{task.fields[failed]} failed[/]"),
+                         console=console if console is not None else Console(stderr=True),
+                         redirect_stdout=False)
+
+    def start_batch(self, total):
+        """ Starts the display; total is the number of entries, or None if it is unknown. """
+        self.task_id = self.add_task("Processing", total=total, succeeded=0, failed=0)
+        self.start()
+
+    def entry_started(self, i, obj):
+        with self.in_flight_lock:
+            self.in_flight[i] = (get_entry_key(obj), time.monotonic())
+
+    def entry_finished(self, i, succeeded):
+        with self.in_flight_lock:
+            self.in_flight.pop(i, None)
+            if succeeded:
+                self.num_succeeded += 1
+            else:
+                self.num_failed += 1
+            self.update(self.task_id, advance=1, succeeded=self.num_succeeded, failed=self.num_failed)
+
+    def entry_skipped(self):
+        self.update(self.task_id, advance=1)
+
+    def get_slowest_in_flight(self):
+        """ Returns (entry, seconds in progress) for the entries that have been in progress the longest. """
+        now = time.monotonic()
+        with self.in_flight_lock:
+            in_flight = sorted(self.in_flight.values(), key=lambda entry_and_start: entry_and_start[1])
+        return [(entry, now - start_time) for entry, start_time in in_flight[:self.num_slowest]]
+
+    def get_renderables(self):
+        yield self.make_tasks_table(self.tasks)
+        slowest = self.get_slowest_in_flight()
+        if len(slowest) > 0:
+            table = Table(box=None, show_header=False, padding=(0, 1))
+            for entry, seconds in slowest:
+                table.add_row(Text(f"{seconds:6.1f}s", style="yellow"), Text(entry))
+            yield table
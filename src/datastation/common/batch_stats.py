@@ -0,0 +1,92 @@
+import math
+import threading
+import time
+from datetime import timedelta
+
+
+class LatencyHistogram:
+    """ A streaming histogram of latencies (in seconds), with logarithmic buckets that are `precision` wide relative
+    to their lower bound. Quantiles are therefore accurate to within that precision, while the memory used only
+    depends on the range of the latencies, not on their number. The minimum and maximum are exact. """
+
+    def __init__(self, precision=0.01, lowest=0.001):
+        self.log_base = math.log(1 + precision)
+        self.lowest = lowest
+        self.buckets = {}
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def record(self, latency):
+        index = self._index(latency)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.min = latency if self.min is None else min(self.min, latency)
+        self.max = latency if self.max is None else max(self.max, latency)
+
+    def quantile(self, q):
+        """ Returns the latency below which a fraction q of the latencies lies, or None if nothing was recorded. """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # the upper bound of the bucket, but never beyond the exact extremes
+                return min(max(self._upper_bound(index), self.min), self.max)
+        return self.max
+
+    def _index(self, latency):
+        if latency <= self.lowest:
+            return 0
+        return int(math.log(latency / self.lowest) / self.log_base) + 1
+
+    def _upper_bound(self, index):
+        return self.lowest * math.exp(index * self.log_base)
+
+
+class BatchStats:
+    """ Collects the latencies of the callbacks in a batch run, the number of processed and failed entries and the
+    throughput. May be used from multiple threads. """
+
+    def __init__(self):
+        self.latencies = LatencyHistogram()
+        self.num_processed = 0
+        self.num_failed = 0
+        self.start_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record_latency(self, latency):
+        with self.lock:
+            self.latencies.record(latency)
+
+    def record_entry(self, succeeded):
+        with self.lock:
+            self.num_processed += 1
+            if not succeeded:
+                self.num_failed += 1
+
+    def get_elapsed_time(self):
+        return time.monotonic() - self.start_time
+
+    def get_throughput(self):
+        """ Returns the number of processed entries per second. """
+        elapsed = self.get_elapsed_time()
+        return self.num_processed / elapsed if elapsed > 0 else 0.0
+
+    def get_error_rate(self):
+        return self.num_failed / self.num_processed if self.num_processed > 0 else 0.0
+
+    def get_summary(self):
+        with self.lock:
+            elapsed = timedelta(seconds=round(self.get_elapsed_time()))
+            lines = [f"Processed {self.num_processed} entries in {elapsed} ({self.get_throughput():.2f} entries/s); "
+                     f"{self.num_failed} failed ({100 * self.get_error_rate():.1f}%)"]
+            if self.latencies.count > 0:
+                lines.append(f"Latency (s): min {self.latencies.min:.3f}, "
+                             f"p50 {self.latencies.quantile(0.5):.3f}, "
+                             f"p95 {self.latencies.quantile(0.95):.3f}, "
+                             f"p99 {self.latencies.quantile(0.99):.3f}, "
+                             f"max {self.latencies.max:.3f}")
+            return '\n'.join(lines)
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+
+import requests
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# How long to wait for the result of the probe request of a half-open circuit breaker before checking again
+PROBE_POLL_INTERVAL = 0.5
+
+_circuit_breakers = weakref.WeakSet()
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """ Raised instead of sending a request while the circuit breaker of the session is open. """
+
+
+def get_circuit_breakers_wait_time():
+    """ Returns the number of seconds until all circuit breakers in this process let requests through again. """
+    return max([circuit_breaker.get_wait_time() for circuit_breaker in list(_circuit_breakers)], default=0)
+
+
+def are_circuit_breakers_closed():
+    """ Returns True if all circuit breakers in this process are closed, i.e. not open and not probing. """
+    return all(circuit_breaker.is_closed() for circuit_breaker in list(_circuit_breakers))
+
+
+class CircuitBreaker:
+    """ Stops sending requests to a server that is failing, to give it time to recover.
+
+    The circuit breaker opens (trips) after failure_threshold consecutive failures, or when at least error_rate of the
+    last window requests failed. A failure is a connection error, a timeout or a 5xx response. While the circuit breaker
+    is open, requests are refused with a CircuitOpenError. After cool_down seconds it becomes half-open: a single probe
+    request is let through, and if that succeeds the circuit breaker closes again, otherwise it opens for another
+    cool_down seconds.
+
+    All circuit breakers are registered, so that a BatchProcessor can pause while any of them is open, see
+    get_circuit_breakers_wait_time, and so that it lets only one entry start until the probe has closed the circuit
+    breakers again, see are_circuit_breakers_closed. A circuit breaker may be used from multiple threads.
+    """
+
+    def __init__(self, failure_threshold=5, error_rate=0.5, window=20, cool_down=30.0):
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.cool_down = cool_down
+        self.outcomes = deque(maxlen=window)
+        self.num_consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+        _circuit_breakers.add(self)
+
+    def before_request(self, url):
+        """ Raises a CircuitOpenError if the request may not be sent now. """
+        with self.lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cool_down:
+                logging.info(f"Circuit breaker half-open, probing {url}")
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return
+            if self.state != CLOSED:
+                raise CircuitOpenError(f"Circuit breaker is {self.state}, not sending request to {url}")
+
+    def record(self, url, succeeded):
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = False
+                if succeeded:
+                    logging.info(f"Circuit breaker closed, {url} responded normally")
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                    self.num_consecutive_failures = 0
+                else:
+                    self._open(url, "the probe failed")
+                return
+            self.outcomes.append(succeeded)
+            self.num_consecutive_failures = 0 if succeeded else self.num_consecutive_failures + 1
+            if self.state == CLOSED:
+                if self.num_consecutive_failures >= self.failure_threshold:
+                    self._open(url, f"{self.num_consecutive_failures} consecutive failures")
+                elif len(self.outcomes) == self.outcomes.maxlen and \
+                        self.outcomes.count(False) >= self.error_rate * len(self.outcomes):
+                    self._open(url, f"{self.outcomes.count(False)} of the last {len(self.outcomes)} requests failed")
+
+    def _open(self, url, reason):
+        logging.warning(f"Circuit breaker opened for {self.cool_down} seconds after a request to {url}: {reason}")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def get_wait_time(self):
+        """ Returns the number of seconds until the circuit breaker lets requests through again. """
+        with self.lock:
+            if self.state == OPEN:
+                return max(0.0, self.opened_at + self.cool_down - time.monotonic())
+            if self.state == HALF_OPEN and self.probe_in_flight:
+                return PROBE_POLL_INTERVAL
+            return 0.0
+
+    def is_closed(self):
+        with self.lock:
+            return self.state == CLOSED
+
+    @staticmethod
+    def is_failure(response):
+        return response.status_code >= 500
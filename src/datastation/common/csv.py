@@ -1,21 +1,32 @@
 import csv
 import logging
+import os
 import sys
+import threading
 
 
 class CsvReport:
-    """A simple, self-closing wrapper around csv.DictWriter to make it easier to use."""
+    """A simple, self-closing wrapper around csv.DictWriter to make it easier to use. Rows may be written from
+    multiple threads. If append is True and the file already has content, rows are appended to it without writing the
+    headers again."""
 
-    def __init__(self, filename, headers):
+    def __init__(self, filename, headers, append=False):
         self.filename = filename
         self.headers = headers
-        self.csv_file = sys.stdout if filename == '-' else open(filename, 'w')
+        self.lock = threading.Lock()
+        if filename == '-':
+            self.csv_file = sys.stdout
+        else:
+            append = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+            self.csv_file = open(filename, 'a' if append else 'w')
         self.csv_writer = csv.DictWriter(self.csv_file, headers, lineterminator='\n')
-        self.csv_writer.writeheader()
+        if not append:
+            self.csv_writer.writeheader()
 
     def write(self, row):
         logging.debug(f"Writing row: {row}")
-        self.csv_writer.writerow(row)
+        with self.lock:
+            self.csv_writer.writerow(row)
 
     def close(self):
         if self.filename != '-':
@@ -1,41 +1,195 @@
+import atexit
+import itertools
+import logging
+import queue
+import threading
+from contextlib import contextmanager
 from typing import Union
 import psycopg
-from psycopg.rows import TupleRow
+from psycopg.pq import TransactionStatus
+from psycopg.rows import TupleRow, dict_row, tuple_row
+
+DEFAULT_POOL_SIZE = 5
+
+# The number of rows that stream() fetches from the server at a time
+DEFAULT_ITERSIZE = 2000
+
+# The number of statements in an update_many after which the changes are committed, unless in a transaction
+DEFAULT_BATCH_SIZE = 1000
+
+_pools = {}
+_pools_lock = threading.Lock()
+_cursor_numbers = itertools.count(1)
+
+
+class ConnectionPool:
+    """ Keeps connections to a database open after use, so that the next Database for the same database does not have
+    to connect again. At most max_size connections are in use at the same time; getting one more blocks until one is
+    returned. Connections that are broken are discarded. The pool may be used from multiple threads. """
+
+    def __init__(self, conninfo, max_size=DEFAULT_POOL_SIZE):
+        self.conninfo = conninfo
+        self.idle = queue.LifoQueue()
+        self.semaphore = threading.BoundedSemaphore(max_size)
+
+    def get_connection(self):
+        self.semaphore.acquire()
+        try:
+            while True:
+                try:
+                    connection = self.idle.get_nowait()
+                except queue.Empty:
+                    return psycopg.connect(self.conninfo)
+                if not connection.closed and connection.info.transaction_status == TransactionStatus.IDLE:
+                    return connection
+                logging.debug("Discarding a broken database connection")
+                connection.close()
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    def put_connection(self, connection):
+        """ Returns a connection to the pool, rolling back what was not committed. """
+        try:
+            if not connection.closed:
+                if connection.info.transaction_status != TransactionStatus.IDLE:
+                    connection.rollback()
+                self.idle.put(connection)
+        except psycopg.Error as e:
+            logging.debug(f"Discarding database connection: {e}")
+            connection.close()
+        finally:
+            self.semaphore.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def get_pool(conninfo, max_size=DEFAULT_POOL_SIZE):
+    """ Returns the process-wide connection pool for the database. """
+    with _pools_lock:
+        if conninfo not in _pools:
+            _pools[conninfo] = ConnectionPool(conninfo, max_size)
+        return _pools[conninfo]
+
+
+@atexit.register
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
 
 
 class Database:
+    """ A connection to a database, taken from a process-wide pool, so that consecutive `with database()` blocks reuse
+    the connection. The size of the pool can be set with 'pool_size' in the configuration.
+
+    Every update is committed right away, unless it is in a transaction(), which commits all its updates at once at
+    the end. Use update_many to execute a statement for many sets of parameters in one go.
+
+    query() returns all rows at once; stream() yields them while they are fetched from the server, 'itersize' (from
+    the configuration) rows at a time, so that large results can be processed in constant memory. """
+
     def __init__(self, config):
         self.host = config["host"]
         self.dbname = config["dbname"]
         self.user = config["user"]
         self.password = config["password"]
-        self.connection: psycopg.Connection[TupleRow] | None = None
+        self.pool_size = config.get("pool_size", DEFAULT_POOL_SIZE)
+        self.itersize = config.get("itersize", DEFAULT_ITERSIZE)
+        self.pool: Union[ConnectionPool, None] = None
+        self.connection: Union[psycopg.Connection[TupleRow], None] = None
+        self.in_transaction = False
 
     def connect(self):
-        self.connection = psycopg.connect(
-            f"host={self.host} dbname={self.dbname} user={self.user} password={self.password}"
-        )
+        self.pool = get_pool(f"host={self.host} dbname={self.dbname} user={self.user} password={self.password}",
+                             self.pool_size)
+        self.connection = self.pool.get_connection()
 
-    def query(self, query):
+    def query(self, query, *args):
         if self.connection is None:
             raise Exception("No connection to database")
 
         with self.connection.cursor() as cursor:
-            cursor.execute(query)
+            cursor.execute(query, *args)
             return cursor.fetchall()
 
+    def stream(self, query, *args, itersize=None, as_dict=False):
+        """ Yields the rows of the result of the query as they are fetched, using a server-side cursor. The rows are
+        tuples, or dictionaries by column name if as_dict is True. Other queries may be executed while streaming, but
+        nothing may be committed, as that closes the cursor. """
+        if self.connection is None:
+            raise Exception("No connection to database")
+
+        with self.connection.cursor(name=f"stream_{next(_cursor_numbers)}",
+                                    row_factory=dict_row if as_dict else tuple_row) as cursor:
+            cursor.itersize = itersize if itersize is not None else self.itersize
+            cursor.execute(query, *args)
+            yield from cursor
+
     def update(self, query, *args):
         if self.connection is None:
             raise Exception("No connection to database")
 
         with self.connection.cursor() as cursor:
             result = cursor.execute(query, *args)
-            self.connection.commit()
+            if not self.in_transaction:
+                self.connection.commit()
             return result.rowcount
 
+    def update_many(self, query, params_seq, batch_size=DEFAULT_BATCH_SIZE):
+        """ Executes the statement once for each set of parameters, in batches of batch_size statements that are sent
+        to the server in a pipeline, and committed after each batch unless in a transaction. Returns the number of rows
+        affected. """
+        if self.connection is None:
+            raise Exception("No connection to database")
+
+        rowcount = 0
+        batch = []
+        with self.connection.cursor() as cursor:
+            for params in params_seq:
+                batch.append(params)
+                if len(batch) == batch_size:
+                    rowcount += self._execute_batch(cursor, query, batch)
+                    batch = []
+            if len(batch) > 0:
+                rowcount += self._execute_batch(cursor, query, batch)
+        return rowcount
+
+    def _execute_batch(self, cursor, query, batch):
+        cursor.executemany(query, batch)
+        if not self.in_transaction:
+            self.connection.commit()
+        logging.debug(f"Executed a batch of {len(batch)} statements")
+        return cursor.rowcount
+
+    @contextmanager
+    def transaction(self):
+        """ Commits the updates in the block at the end of it, or rolls them back if the block raises an exception. """
+        if self.connection is None:
+            raise Exception("No connection to database")
+        if self.in_transaction:
+            raise Exception("Already in a transaction")
+
+        self.in_transaction = True
+        try:
+            yield self
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        finally:
+            self.in_transaction = False
+
     def close(self):
         if self.connection is not None:
-            self.connection.close()
+            self.pool.put_connection(self.connection)
+            self.connection = None
 
     def __enter__(self):
         self.connect()
@@ -0,0 +1,179 @@
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import sys
+import threading
+from array import array
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class DigestSet:
+    """ A set of strings that only stores a 64-bit digest of each string, in an open-addressing hash table backed by an
+    array, which takes 16 to 32 bytes per string, as the table is kept at most half full and doubles when it gets
+    there. Two different strings are taken to be the same if their digests are equal; for a million strings the chance
+    of that happening is in the order of 1 in 10^7. """
+
+    def __init__(self, capacity=1024):
+        self.slots = array('Q', bytes(8 * capacity))
+        self.size = 0
+
+    @staticmethod
+    def digest(s):
+        d = int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+        return d if d != 0 else 1  # 0 marks an empty slot
+
+    def add(self, s):
+        """ Adds the string and returns True if it was not in the set yet. """
+        if 2 * (self.size + 1) > len(self.slots):
+            self._grow()
+        if self._insert(self.digest(s)):
+            self.size += 1
+            return True
+        return False
+
+    def __contains__(self, s):
+        d = self.digest(s)
+        mask = len(self.slots) - 1
+        i = d & mask
+        while self.slots[i] != 0:
+            if self.slots[i] == d:
+                return True
+            i = (i + 1) & mask
+        return False
+
+    def __len__(self):
+        return self.size
+
+    def _insert(self, d):
+        mask = len(self.slots) - 1
+        i = d & mask
+        while self.slots[i] != 0:
+            if self.slots[i] == d:
+                return False
+            i = (i + 1) & mask
+        self.slots[i] = d
+        return True
+
+    def _grow(self):
+        old_slots = self.slots
+        self.slots = array('Q', bytes(16 * len(old_slots)))
+        for d in old_slots:
+            if d != 0:
+                self._insert(d)
+
+
+def open_entries_file(filename):
+    """ Opens a text file for reading, decompressing it if it is gzip or zstd compressed; '-' means stdin. """
+    if filename == '-':
+        return sys.stdin
+    f = open(filename, 'rb')
+    magic = f.read(4)
+    f.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(f, 'rt')
+    elif magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            f.close()
+            raise RuntimeError(f"{filename} is zstd compressed, but the zstandard package is not installed")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(f, closefd=True))
+    else:
+        return io.TextIOWrapper(f)
+
+
+class EntryStream:
+    """ Streams the entries in a file with one entry per line, or on stdin if the filename is '-'. Blank lines, comment
+    lines (starting with '#') and repeated entries are skipped.
+
+    The number of entries is only counted when count() is called, by reading the file an extra time. The entries on
+    stdin cannot be counted in advance.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.num_entries = None
+
+    def __iter__(self):
+        seen = DigestSet()
+        num_duplicates = 0
+        for entry in self._read_entries():
+            if seen.add(entry):
+                yield entry
+            else:
+                num_duplicates += 1
+                logging.debug(f"Skipping duplicate entry: {entry}")
+        if num_duplicates > 0:
+            logging.info(f"Skipped {num_duplicates} duplicate entries")
+
+    def count(self):
+        """ Returns the number of unique entries, or None if they are read from stdin. """
+        if self.filename == '-':
+            return None
+        if self.num_entries is None:
+            seen = DigestSet()
+            for entry in self._read_entries():
+                seen.add(entry)
+            self.num_entries = len(seen)
+        return self.num_entries
+
+    def _read_entries(self):
+        f = open_entries_file(self.filename)
+        try:
+            for line in f:
+                entry = line.strip()
+                if entry != '' and not entry.startswith('#'):
+                    yield entry
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+class FailedEntriesFile:
+    """ Writes entries to a file as soon as they are added, in a format that can be read back as input: strings one per
+    line, as read by EntryStream, and dictionaries (e.g. rows read from a CSV file) as CSV rows, with the keys of the
+    first dictionary as the header. Entries may be added from multiple threads.
+
+    The entries are written to the file name with suffix .part, which replaces the file when it is closed, so that the
+    file may also be the input of the run, e.g. when only the entries that failed before are processed again. """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.part_filename = f"{filename}.part"
+        self.lock = threading.Lock()
+        self.file = None
+        self.csv_writer = None
+        self.num_entries = 0
+
+    def add(self, entry):
+        with self.lock:
+            if type(entry) is dict:
+                if self.csv_writer is None:
+                    self.csv_writer = csv.DictWriter(self.file, list(entry.keys()), lineterminator='\n')
+                    self.csv_writer.writeheader()
+                self.csv_writer.writerow(entry)
+            else:
+                self.file.write(f"{entry}\n")
+            self.file.flush()
+            self.num_entries += 1
+
+    def open(self):
+        self.file = open(self.part_filename, 'w', newline='')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.replace(self.part_filename, self.filename)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
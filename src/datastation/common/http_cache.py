@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_SIZE_MB = 100
+
+# The response headers that are stored with a cached response
+STORED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified']
+
+
+class HttpCache:
+    """ A persistent cache of the responses to GET requests, in an SQLite database, so that the responses can be reused
+    by later runs of a command.
+
+    A response is served from the cache for ttl seconds after it was fetched. After that it is revalidated with the
+    server if the server sent an ETag or Last-Modified header with it, otherwise it is fetched again. If the total size
+    of the cached responses exceeds max_size_mb megabytes, the least recently used responses are evicted. Only
+    successful (200) responses are cached. The cache may be used from multiple threads.
+
+    Responses are cached per API token, because they depend on the permissions of the user.
+    """
+
+    def __init__(self, filename, ttl=DEFAULT_TTL, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_size = max_size_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS responses ('
+                                'key TEXT PRIMARY KEY, url TEXT NOT NULL, headers TEXT NOT NULL, body BLOB NOT NULL, '
+                                'size INTEGER NOT NULL, fetched REAL NOT NULL, last_used REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+        self.connection.commit()
+        self.num_hits = 0
+        self.num_revalidated = 0
+        self.num_misses = 0
+        self.num_evicted = 0
+
+    def get(self, session, url, headers=None, params=None):
+        """ Returns the response to a GET request, from the cache if it is there and still fresh. """
+        headers = dict(headers) if headers is not None else {}
+        key = self._get_key(url, headers, params)
+        with self.lock:
+            row = self.connection.execute('SELECT headers, body, fetched FROM responses WHERE key = ?',
+                                          (key,)).fetchone()
+        if row is not None:
+            cached_headers = CaseInsensitiveDict(json.loads(row[0]))
+            if time.time() - row[2] < self.ttl:
+                logging.debug(f"Cache hit: {url} {params}")
+                self._touch(key, refetched=False)
+                with self.lock:
+                    self.num_hits += 1
+                return self._to_response(url, row[1], cached_headers)
+            if 'ETag' in cached_headers:
+                headers['If-None-Match'] = cached_headers['ETag']
+            if 'Last-Modified' in cached_headers:
+                headers['If-Modified-Since'] = cached_headers['Last-Modified']
+        r = session.get(url, headers=headers, params=params)
+        if r.status_code == 304 and row is not None:
+            logging.debug(f"Cache revalidated: {url} {params}")
+            self._touch(key, refetched=True)
+            with self.lock:
+                self.num_revalidated += 1
+            return self._to_response(url, row[1], cached_headers)
+        with self.lock:
+            self.num_misses += 1
+        if r.status_code == 200:
+            self._store(key, url, r)
+        return r
+
+    def _get_key(self, url, headers, params):
+        token = headers.get('X-Dataverse-key', '')
+        query = urlencode(sorted(params.items())) if params is not None else ''
+        return hashlib.sha256(f"{url}?{query}#{token}".encode('utf-8')).hexdigest()
+
+    def _touch(self, key, refetched):
+        now = time.time()
+        with self.lock:
+            if refetched:
+                self.connection.execute('UPDATE responses SET fetched = ?, last_used = ? WHERE key = ?',
+                                        (now, now, key))
+            else:
+                self.connection.execute('UPDATE responses SET last_used = ? WHERE key = ?', (now, key))
+            self.connection.commit()
+
+    def _store(self, key, url, r):
+        headers = {name: r.headers[name] for name in STORED_HEADERS if name in r.headers}
+        now = time.time()
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO responses (key, url, headers, body, size, fetched, '
+                                    'last_used) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    (key, url, json.dumps(headers), r.content, len(r.content), now, now))
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        total_size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        evicted = []
+        for key, size in self.connection.execute('SELECT key, size FROM responses ORDER BY last_used'):
+            if total_size <= self.max_size:
+                break
+            evicted.append((key,))
+            total_size -= size
+        self.connection.executemany('DELETE FROM responses WHERE key = ?', evicted)
+        self.num_evicted += len(evicted)
+
+    @staticmethod
+    def _to_response(url, body, headers):
+        r = requests.Response()
+        r.status_code = 200
+        r.reason = 'OK'
+        r.url = url
+        r.headers = headers
+        r.encoding = requests.utils.get_encoding_from_headers(headers)
+        r._content = body
+        return r
+
+    def get_summary(self):
+        return (f"HTTP cache: {self.num_hits} hits, {self.num_revalidated} revalidated, {self.num_misses} misses, "
+                f"{self.num_evicted} evicted")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
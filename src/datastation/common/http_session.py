@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from datastation.common.circuit_breaker import CircuitBreaker
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 300
+
+_deadline = threading.local()
+
+
+class DeadlineExceeded(requests.Timeout):
+    """ Raised instead of sending a request after the deadline of the current thread has passed. """
+
+
+@contextmanager
+def deadline(seconds):
+    """ Sets a deadline for the requests that the current thread sends through sessions created by create_session:
+    their timeouts are cut to the time left, and after the deadline no new requests are sent. A deadline within
+    another deadline cannot extend it. With seconds=None, nothing changes. """
+    previous = getattr(_deadline, 'time', None)
+    if seconds is not None:
+        new = time.monotonic() + seconds
+        _deadline.time = new if previous is None else min(previous, new)
+    try:
+        yield
+    finally:
+        _deadline.time = previous
+
+
+def get_remaining_time():
+    """ Returns the number of seconds until the deadline of the current thread, or None if there is no deadline. """
+    deadline_time = getattr(_deadline, 'time', None)
+    return None if deadline_time is None else deadline_time - time.monotonic()
+
+
+class TimeoutSession(requests.Session):
+    """ A session with default connect and read timeouts, which are cut to the time left until the deadline of the
+    current thread, if any. A timeout of None means waiting forever.
+
+    If a circuit breaker is given, it is told the outcome of each request, and requests are refused while it is open.
+    """
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 circuit_breaker: CircuitBreaker = None):
+        super().__init__()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.circuit_breaker = circuit_breaker
+
+    def request(self, method, url, **kwargs):
+        timeout = kwargs.pop('timeout', None)
+        if timeout is None:
+            connect_timeout, read_timeout = self.connect_timeout, self.read_timeout
+        elif isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+        else:
+            connect_timeout, read_timeout = timeout, timeout
+        remaining = get_remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline passed, not sending {method} {url}")
+            connect_timeout = remaining if connect_timeout is None else min(connect_timeout, remaining)
+            read_timeout = remaining if read_timeout is None else min(read_timeout, remaining)
+        if self.circuit_breaker is None:
+            return super().request(method, url, timeout=(connect_timeout, read_timeout), **kwargs)
+        self.circuit_breaker.before_request(url)
+        try:
+            r = super().request(method, url, timeout=(connect_timeout, read_timeout), **kwargs)
+        except Exception as e:
+            self.circuit_breaker.record(url, succeeded=not isinstance(e, (requests.ConnectionError, requests.Timeout)))
+            raise
+        self.circuit_breaker.record(url, succeeded=not CircuitBreaker.is_failure(r))
+        return r
+
+
+def create_session(config: dict = None, read_timeout=DEFAULT_READ_TIMEOUT) -> requests.Session:
+    """ Creates a session that keeps connections to a server open, so that consecutive requests do not have to set up
+    a new TCP (and TLS) connection each time, and that does not wait forever for a server. The session may be shared by
+    multiple threads.
+
+    Args:
+        config: the optional 'http' section of a service configuration, with the keys:
+                pool_size:       the maximum number of open connections per host (default: 10). Use at least the
+                                 number of threads that share the session, otherwise connections are closed after each
+                                 request.
+                keep_alive:      whether to keep connections open between requests (default: True)
+                connect_timeout: the number of seconds to wait for a connection (default: 10)
+                read_timeout:    the number of seconds to wait for the server to send data, or None to wait forever
+                                 (default: the read_timeout argument)
+                circuit_breaker: the arguments of the CircuitBreaker of the session (default: its defaults), or false
+                                 for no circuit breaker
+        read_timeout: the read timeout of the service if the configuration does not set one (default: 300); services
+                      of which a single request may take very long, such as the validation of a large bag, use None
+    """
+    if config is None:
+        config = {}
+    pool_size = config.get('pool_size', DEFAULT_POOL_SIZE)
+    circuit_breaker_config = config.get('circuit_breaker', {})
+    session = TimeoutSession(connect_timeout=config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+                             read_timeout=config.get('read_timeout', read_timeout),
+                             circuit_breaker=CircuitBreaker(**circuit_breaker_config)
+                             if circuit_breaker_config is not False else None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not config.get('keep_alive', True):
+        session.headers['Connection'] = 'close'
+    return session
+
+
+class MemoizingSession:
+    """ Wraps a session for a single unit of work, such as the processing of one dataset in a batch. Identical GET
+    requests made with get_memoized are sent only once; the successful response is remembered and returned again.
+    A POST, PUT or DELETE request made through the wrapper may change the results of those requests, so it makes the
+    wrapper forget all remembered responses.
+
+    If a cache is given, get_memoized also goes through that cache.
+    """
+
+    def __init__(self, session: requests.Session, cache=None):
+        self.session = session
+        self.cache = cache
+        self.responses = {}
+
+    def get_memoized(self, url, headers=None, params=None):
+        key = (url, tuple(sorted(params.items())) if params is not None else ())
+        if key in self.responses:
+            return self.responses[key]
+        if self.cache is not None:
+            r = self.cache.get(self.session, url, headers=headers, params=params)
+        else:
+            r = self.session.get(url, headers=headers, params=params)
+        if r.status_code == 200:
+            self.responses[key] = r
+        return r
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        self.responses.clear()
+        return self.session.post(url, **kwargs)
+
+    def put(self, url, **kwargs):
+        self.responses.clear()
+        return self.session.put(url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        self.responses.clear()
+        return self.session.delete(url, **kwargs)
@@ -0,0 +1,74 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+OUTCOME_OK = 'OK'
+
+
+def get_entry_key(entry):
+    """ Returns the key under which an entry of a batch is journaled: the entry itself if it is a string, the value of
+    'PID' if it is a dictionary with that key, and otherwise its JSON representation. """
+    if type(entry) is str:
+        return entry
+    elif type(entry) is dict and 'PID' in entry.keys():
+        return entry['PID']
+    else:
+        return json.dumps(entry, sort_keys=True, default=str)
+
+
+class Journal:
+    """ Keeps track of the entries that a batch run has finished, and their outcomes, in an SQLite database, so that an
+    interrupted run can be resumed. Looking up an entry uses the primary key index of the database, so it does not
+    depend on the number of entries in the journal. The journal may be used from multiple threads.
+
+    Unless resume is True, the journal is cleared when it is opened.
+    """
+
+    def __init__(self, filename, resume=False):
+        self.filename = filename
+        self.resume = resume
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def open(self):
+        self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS journal ('
+                                'entry TEXT PRIMARY KEY, outcome TEXT NOT NULL, finished TEXT NOT NULL)')
+        if self.resume:
+            logging.info(f"Resuming from journal {self.filename}: {self.count_done()} entries already done")
+        else:
+            self.connection.execute('DELETE FROM journal')
+        self.connection.commit()
+
+    def is_done(self, entry):
+        """ Returns True if the entry was processed successfully before. """
+        with self.lock:
+            row = self.connection.execute('SELECT outcome FROM journal WHERE entry = ?',
+                                          (get_entry_key(entry),)).fetchone()
+        return row is not None and row[0] == OUTCOME_OK
+
+    def record(self, entry, outcome=OUTCOME_OK):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO journal (entry, outcome, finished) VALUES (?, ?, ?)',
+                                    (get_entry_key(entry), outcome, datetime.now().isoformat()))
+            self.connection.commit()
+
+    def count_done(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM journal WHERE outcome = ?', (OUTCOME_OK,)).fetchone()[0]
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,42 @@
+import random
+
+import requests
+
+# Status codes with which Dataverse reports that a dataset is locked, e.g. by an ongoing ingest or publication
+LOCK_CONFLICT_STATUS_CODES = [409, 423]
+
+
+def is_retryable(exception):
+    """ Returns True if the exception is likely to be transient: a connection error or timeout, a 5xx response, a
+    response that reports a lock conflict, or a lock that was not removed in time. Other 4xx responses are not
+    retryable, as they will not go away by trying again. """
+    if isinstance(exception, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exception, requests.HTTPError) and exception.response is not None:
+        status_code = exception.response.status_code
+        if status_code >= 500 or status_code in LOCK_CONFLICT_STATUS_CODES:
+            return True
+        return status_code == 403 and 'locked' in exception.response.text.lower()
+    # raised by DatasetApi.await_unlock
+    return isinstance(exception, RuntimeError) and str(exception).startswith('Locks')
+
+
+class RetryPolicy:
+    """ Decides whether a failed attempt to process an entry is retried, and how long to wait before the next attempt.
+
+    The delay grows exponentially: the maximum delay before attempt n + 1 is base_delay * 2^(n-1), capped at
+    max_delay. The actual delay is a random fraction of that maximum ("full jitter"), so that workers that failed at
+    the same time do not retry at the same time.
+    """
+
+    def __init__(self, max_attempts=1, base_delay=1.0, max_delay=60.0, classifier=is_retryable):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.classifier = classifier
+
+    def should_retry(self, exception, attempt):
+        return attempt < self.max_attempts and self.classifier(exception)
+
+    def get_delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import deque
+
+# Status codes with which a server tells us to slow down
+OVERLOAD_STATUS_CODES = [429, 503]
+
+
+def get_status_code(exception):
+    """ Returns the HTTP status code of the response attached to the exception (e.g. a requests.HTTPError), or None. """
+    response = getattr(exception, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def get_retry_after(exception):
+    """ Returns the number of seconds in the Retry-After header of the response attached to the exception, or None. """
+    response = getattr(exception, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers is None:
+        return None
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class Throttle:
+    """ Decides how long the batch processor waits before it starts processing the next entry.
+
+    The batch processor calls before_entry before each entry and record after each entry. Both may be called from
+    different threads.
+    """
+
+    def before_entry(self, i):
+        raise NotImplementedError()
+
+    def record(self, latency, exception=None):
+        pass
+
+
+class FixedWaitThrottle(Throttle):
+    """ Waits a fixed number of seconds between entries. """
+
+    def __init__(self, wait):
+        self.wait = wait
+
+    def before_entry(self, i):
+        if self.wait > 0 and i > 1:
+            logging.debug(f"Waiting {self.wait} seconds before processing next entry")
+            time.sleep(self.wait)
+
+
+class TokenBucketThrottle(Throttle):
+    """ Starts entries at a target rate (entries per second), allowing bursts of at most `burst` entries. """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate must be a number greater than zero")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def before_entry(self, i):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            # Taking a token may leave the bucket in debt; the debt is paid off by waiting
+            self.tokens -= 1
+            delay = max(-self.tokens / self.rate, self.paused_until - now, 0)
+        if delay > 0:
+            logging.debug(f"Waiting {delay:.2f} seconds before processing next entry (rate: {self.rate:.2f}/s)")
+            time.sleep(delay)
+
+
+class AimdThrottle(TokenBucketThrottle):
+    """ A token bucket with an adaptive rate, using additive increase, multiplicative decrease (AIMD).
+
+    The rate starts at max_rate. When the server shows signs of overload, i.e. it responds with 429 or 503, or an
+    entry takes more than latency_factor times the baseline latency, the rate is multiplied by decrease_factor, but
+    not below min_rate. A Retry-After header on such a response pauses the throttle for the indicated time. Every
+    healthy entry raises the rate by additive_increase / rate, which comes down to additive_increase entries per
+    second for every second of healthy processing, until max_rate is reached again.
+
+    The baseline latency is the baseline_quantile of the latencies of the last `window` successful entries. A few
+    exceptionally fast entries, e.g. entries that are skipped, therefore do not set the baseline for the rest of the
+    run, and the baseline follows the server when its normal latency changes.
+    """
+
+    def __init__(self, max_rate, min_rate=None, additive_increase=0.1, decrease_factor=0.5, latency_factor=3.0,
+                 window=50, baseline_quantile=0.2):
+        super().__init__(max_rate)
+        self.max_rate = max_rate
+        self.min_rate = min_rate if min_rate is not None else max_rate / 50
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.latencies = deque(maxlen=window)
+        self.baseline_quantile = baseline_quantile
+        self.last_decrease = 0
+
+    def record(self, latency, exception=None):
+        status_code = get_status_code(exception)
+        with self.lock:
+            baseline_latency = self.get_baseline_latency()
+            if exception is None:
+                self.latencies.append(latency)
+
+            if status_code in OVERLOAD_STATUS_CODES:
+                retry_after = get_retry_after(exception)
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                self._decrease(f"server responded with {status_code}")
+            elif baseline_latency is not None and latency > self.latency_factor * baseline_latency:
+                self._decrease(f"latency {latency:.2f}s exceeds {self.latency_factor} times the baseline "
+                               f"{baseline_latency:.2f}s")
+            else:
+                self.rate = min(self.max_rate, self.rate + self.additive_increase / self.rate)
+
+    def get_baseline_latency(self):
+        """ Returns the baseline latency, or None if no entry has succeeded yet. """
+        if len(self.latencies) == 0:
+            return None
+        return sorted(self.latencies)[int(self.baseline_quantile * (len(self.latencies) - 1))]
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        # Entries that were already in flight report the same overload; only react to it once per interval
+        if now - self.last_decrease < 1 / self.rate:
+            return
+        self.last_decrease = now
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        logging.warning(f"Lowering rate to {self.rate:.2f} entries per second: {reason}")
+
+
+def create_throttle(wait=0.1, rate=None, adaptive=False):
+    """ Creates the throttle for the batch processor options. A rate replaces the fixed wait between entries. In
+    adaptive mode the rate is the maximum rate; if it is not given, the rate implied by the wait is used. """
+    if adaptive:
+        if rate is None:
+            rate = 1 / wait if wait > 0 else 1.0
+        return AimdThrottle(max_rate=rate)
+    elif rate is not None:
+        return TokenBucketThrottle(rate)
+    else:
+        return FixedWaitThrottle(wait)
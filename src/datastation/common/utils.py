@@ -11,14 +11,77 @@ def add_dry_run_arg(parser):
                         help='Do not perform the action, but show what would be done.')
 
 
+def add_no_cache_arg(parser):
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true',
+                        help='Do not use the cache of Dataverse responses configured in the dataverse section.')
+
+
 def add_batch_processor_args(parser, report: bool = True):
     parser.add_argument('-w', '--wait-between-items', default=2.0, type=float,
                         help="number of seconds to wait between processing items",
                         dest='wait')
     parser.add_argument('-f', '--fail-fast', dest='fail_fast', action='store_true', help='fail on first error ')
+    parser.add_argument('--parallel', default=1, type=positive_int_argument_converter,
+                        help="number of items to process concurrently (default: 1)", dest='parallel')
+    parser.add_argument('--rate', type=float,
+                        help="target number of items to start per second; replaces the wait between items",
+                        dest='rate')
+    parser.add_argument('--adaptive', action='store_true',
+                        help="lower the rate when the server responds slowly or with 429 or 503, and raise it again "
+                             "up to the target rate when the server is healthy",
+                        dest='adaptive')
+    parser.add_argument('--max-attempts', default=1, type=positive_int_argument_converter,
+                        help="number of times to try an item that fails with a connection error, a 5xx response or a "
+                             "lock conflict, waiting exponentially longer between the attempts (default: 1)",
+                        dest='max_attempts')
+    parser.add_argument('--progress', action='store_true',
+                        help="show a live progress bar on stderr instead of logging each item", dest='progress')
+    parser.add_argument('--max-duration', type=duration_argument_converter, dest='max_duration',
+                        help="stop taking new items after this time, in seconds or with suffix s, m or h (e.g. 90m); "
+                             "the items in progress are finished")
+    parser.add_argument('--failed-out', dest='failed_out',
+                        help="file to which each item that fails is written, so that it can be used as input to "
+                             "process only the failed items again; may be the input file itself. During the run the "
+                             "items are written right away to the file name with suffix .part")
+    parser.add_argument('--entry-timeout', type=duration_argument_converter, dest='entry_timeout',
+                        help="the time each attempt at an item may take for its HTTP requests, in seconds or with "
+                             "suffix s, m or h; a request that would take longer fails with a timeout")
     if report:
         parser.add_argument('-r', '--report-file', default='-', help="the report file, or - for stdout",
                             dest='report_file')
+        parser.add_argument('--journal-file', dest='journal_file',
+                            help="the file in which finished items are recorded (default: the report file name with "
+                                 "suffix .journal; none if the report is written to stdout)")
+        parser.add_argument('--resume', dest='resume', action='store_true',
+                            help="skip the items that the journal records as done and append to the report file")
+        parser.add_argument('--report-durations', dest='report_durations', action='store_true',
+                            help="add a column with the number of seconds it took to process the item to the report")
+
+
+def batch_processor_kwargs(args, report: bool = True, **overrides):
+    """ Returns the keyword arguments for a BatchProcessor, or with report for a BatchProcessorWithReport, from the
+    options added by add_batch_processor_args. The overrides replace or add keyword arguments. """
+    kwargs = {
+        'wait': args.wait,
+        'fail_on_first_error': args.fail_fast,
+        'parallel': args.parallel,
+        'rate': args.rate,
+        'adaptive': args.adaptive,
+        'max_attempts': args.max_attempts,
+        'progress': args.progress,
+        'max_duration': args.max_duration,
+        'failed_out': args.failed_out,
+        'entry_timeout': args.entry_timeout,
+    }
+    if report:
+        kwargs.update({
+            'report_file': args.report_file,
+            'journal_file': args.journal_file,
+            'resume': args.resume,
+            'report_durations': args.report_durations,
+        })
+    kwargs.update(overrides)
+    return kwargs
 
 
 def raise_for_status_after_log(r: requests.Response):
@@ -39,6 +102,21 @@ def positive_int_argument_converter(value):
         raise argparse.ArgumentTypeError("value must be a number greater than zero")
 
 
+def duration_argument_converter(value):
+    """ Converts a duration in seconds, or with a suffix s, m or h, to a number of seconds. """
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    try:
+        if len(value) > 0 and value[-1] in units:
+            seconds = float(value[:-1]) * units[value[-1]]
+        else:
+            seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("value must be a duration like 3600, 90m or 6h")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("value must be a duration greater than zero")
+    return seconds
+
+
 def print_dry_run_message(method, url, params=None, headers=None, data=None, json=None):
     print("DRY-RUN: only printing command, not sending it...")
     print(f"{method} {url}")
@@ -5,10 +5,10 @@ from email import encoders
 from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 
-import requests
 import yaml
 
 from datastation.common.find_bags import find_bags
+from datastation.common.http_session import create_session
 from datastation.common.result_writer import ResultWriter
 
 
@@ -16,6 +16,8 @@ class ValidateDansBag:
     def __init__(self, config: dict, accept_type: str = 'application/json'):
         self.server_url = config['service_baseurl']
         self.accept_type = accept_type
+        # validating a large bag may take longer than any sensible read timeout, so by default there is none
+        self.session = create_session(config.get('http'), read_timeout=None)
 
     def validate(self, path: str, info_package_type: str, result_writer: ResultWriter, dry_run: bool = False):
         try:
@@ -47,7 +49,7 @@ class ValidateDansBag:
             print("Would have sent the following request:")
             print("POST {}/validate".format(self.server_url))
             return
-        r = requests.post('{}/validate'.format(self.server_url), data=body,
+        r = self.session.post('{}/validate'.format(self.server_url), data=body,
                           headers=headers)
         if self.accept_type == 'application/json':
             result = json.loads(r.text)
@@ -2,15 +2,17 @@ import json
 
 import requests
 
+from datastation.common.http_session import create_session
 from datastation.common.utils import raise_for_status_after_log
 
 
 class BannerApi:
 
-    def __init__(self, server_url: str, api_token: str, unblock_key: str):
+    def __init__(self, server_url: str, api_token: str, unblock_key: str, session: requests.Session = None):
         self.server_url = server_url
         self.api_token = api_token
         self.unblock_key = unblock_key
+        self.session = session if session is not None else create_session()
 
     def list(self, dry_run: bool = False):
         """ List all banners. """
@@ -19,7 +21,7 @@ class BannerApi:
         if dry_run:
             print(f"Would have sent the following request: {url}")
             return
-        r = requests.get(url, headers=headers, params={'unblock-key': self.unblock_key})
+        r = self.session.get(url, headers=headers, params={'unblock-key': self.unblock_key})
         raise_for_status_after_log(r)
         return r
 
@@ -40,7 +42,7 @@ class BannerApi:
             print(f"Would have sent the following request: {url}")
             print(json.dumps(banner, indent=4))
             return
-        r = requests.post(url, headers=headers, params={'unblock-key': self.unblock_key}, json=banner)
+        r = self.session.post(url, headers=headers, params={'unblock-key': self.unblock_key}, json=banner)
         raise_for_status_after_log(r)
         return r
 
@@ -51,6 +53,6 @@ class BannerApi:
         if dry_run:
             print(f"Would have sent the following request: {url}")
             return
-        r = requests.delete(url, headers=headers, params={'unblock-key': self.unblock_key})
+        r = self.session.delete(url, headers=headers, params={'unblock-key': self.unblock_key})
         raise_for_status_after_log(r)
         return r
@@ -1,5 +1,4 @@
-import requests
-
+from datastation.common.http_session import create_session
 from datastation.common.utils import print_dry_run_message
 
 
@@ -28,11 +27,12 @@ class User:
 
 class BuiltInUsersApi:
 
-    def __init__(self, server_url, api_token, builtin_user_key, unblock_key=None):
+    def __init__(self, server_url, api_token, builtin_user_key, unblock_key=None, session=None):
         self.server_url = server_url
         self.api_token = api_token
         self.builtin_users_key = builtin_user_key
         self.unblock_key = unblock_key
+        self.session = session if session is not None else create_session()
 
     def create(self, user: User, initial_password="dummy1234",
                send_email_notification=False, dry_run=False):
@@ -48,4 +48,4 @@ class BuiltInUsersApi:
             print_dry_run_message(method='POST', url=url, headers=headers, params=params, json=user.to_json())
             return None
         else:
-            return requests.post(url, headers=headers, params=params, json=user.to_json())
+            return self.session.post(url, headers=headers, params=params, json=user.to_json())
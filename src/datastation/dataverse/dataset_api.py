@@ -1,19 +1,20 @@
 import json
 import time
 
-import requests
-
+from datastation.common.http_session import MemoizingSession, create_session
 from datastation.common.utils import print_dry_run_message, raise_for_status_after_log
 
 
 class DatasetApi:
 
-    def __init__(self, pid, server_url, api_token, unblock_key, safety_latch):
+    def __init__(self, pid, server_url, api_token, unblock_key, safety_latch, session=None, cache=None):
         self.pid = pid
         self.server_url = server_url
         self.api_token = api_token
         self.unblock_key = unblock_key
         self.safety_latch = safety_latch
+        # identical GET requests for dataset versions, metadata and role assignments are only sent once per object
+        self.session = MemoizingSession(session if session is not None else create_session(), cache)
 
     def get_pid(self):
         return self.pid
@@ -27,7 +28,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         
-        dv_resp = requests.get(url, headers=headers, params=params)
+        dv_resp = self.session.get_memoized(url, headers=headers, params=params)
         raise_for_status_after_log(dv_resp)
 
         resp_data = dv_resp.json()['data']
@@ -41,7 +42,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.get(url, headers=headers, params=params)
+            r = self.session.get_memoized(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()['data']
 
@@ -55,7 +56,7 @@ class DatasetApi:
                                   data=json.dumps(role_assignment))
             return None
         else:
-            r = requests.post(url, headers=headers, params=params, json=role_assignment)
+            r = self.session.post(url, headers=headers, params=params, json=role_assignment)
             raise_for_status_after_log(r)
             return r
 
@@ -67,7 +68,7 @@ class DatasetApi:
             print_dry_run_message(method='DELETE', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.delete(url, headers=headers, params=params)
+            r = self.session.delete(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r
 
@@ -79,7 +80,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.get(url, headers=headers, params=params)
+            r = self.session.get(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()['data']['latestVersion']['versionState'] == 'DRAFT'
 
@@ -91,7 +92,7 @@ class DatasetApi:
             print_dry_run_message(method='DELETE', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.delete(url, headers=headers, params=params)
+            r = self.session.delete(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()
 
@@ -107,7 +108,7 @@ class DatasetApi:
             if dry_run:
                 print_dry_run_message(method='DELETE', url=url, headers=headers, params=params)
                 return None
-            r = requests.delete(url, headers=headers, params=params)
+            r = self.session.delete(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()
 
@@ -124,7 +125,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.get(url, headers=headers, params=params)
+            r = self.session.get_memoized(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()['data']
 
@@ -140,7 +141,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.get(url, headers=headers, params=params)
+            r = self.session.get_memoized(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.text
 
@@ -154,7 +155,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.get(url, headers=headers, params=params)
+            r = self.session.get(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()['data']
 
@@ -166,7 +167,7 @@ class DatasetApi:
             print_dry_run_message(method='POST', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.post(url, headers=headers, params=params)
+            r = self.session.post(url, headers=headers, params=params)
             raise_for_status_after_log(r)
             return r.json()
 
@@ -180,7 +181,7 @@ class DatasetApi:
             print_dry_run_message(method='DELETE', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.delete(url, headers=headers, params=params)
+            r = self.session.delete(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()
 
@@ -194,7 +195,7 @@ class DatasetApi:
         if dry_run:
             print_dry_run_message(method='POST', url=url, headers=headers, params=params)
             return None
-        r = requests.post(url, headers=headers, params=params)
+        r = self.session.post(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()
 
@@ -208,7 +209,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.get(url, headers=headers, params=params)
+            r = self.session.get(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()
 
@@ -220,7 +221,7 @@ class DatasetApi:
             print_dry_run_message(method='POST', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.post(url, headers=headers, params=params)
+            r = self.session.post(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()
 
@@ -232,7 +233,7 @@ class DatasetApi:
             print_dry_run_message(method='GET', url=url, headers=headers, params=params)
             return None
         else:
-            r = requests.get(url, headers=headers, params=params)
+            r = self.session.get(url, headers=headers, params=params)
         raise_for_status_after_log(r)
         return r.json()['data']
 
@@ -261,6 +262,6 @@ class DatasetApi:
             print_dry_run_message(method='PUT', url=url, headers=headers, params=params, data=data)
             return None
         else:
-            r = requests.put(url, headers=headers, params=params, data=data)
+            r = self.session.put(url, headers=headers, params=params, data=data)
             raise_for_status_after_log(r)
             return r
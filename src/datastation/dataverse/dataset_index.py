@@ -0,0 +1,230 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# The latest version of each dataset, with the number and total size of its files
+DATASETS_QUERY = \
+    "select dvo.id, concat(dvo.protocol, ':', dvo.authority, '/', dvo.identifier), dvo.owner_id, " \
+    "dv.versionstate, count(fm.id), coalesce(sum(df.filesize), 0), dvo.modificationtime, " \
+    "dvo.permissionmodificationtime " \
+    "from dvobject dvo " \
+    "inner join datasetversion dv on dv.dataset_id = dvo.id " \
+    "and dv.id = (select max(id) from datasetversion where dataset_id = dvo.id) " \
+    "left join filemetadata fm on fm.datasetversion_id = dv.id " \
+    "left join datafile df on df.id = fm.datafile_id " \
+    "where dvo.dtype = 'Dataset' {condition} " \
+    "group by dvo.id, dv.versionstate"
+
+COLLECTIONS_QUERY = \
+    "select dvo.id, dvo.owner_id, dv.alias from dvobject dvo inner join dataverse dv on dv.id = dvo.id"
+
+# The role assignments on datasets: the id and PID of the dataset, the assignee and the alias of the role
+ROLE_ASSIGNMENTS_QUERY = \
+    "select dvo.id, concat(dvo.protocol, ':', dvo.authority, '/', dvo.identifier), ra.assigneeidentifier, dr.alias " \
+    "from roleassignment ra inner join dataverserole dr on ra.role_id = dr.id " \
+    "inner join dvobject dvo on ra.definitionpoint_id = dvo.id " \
+    "where dvo.dtype = 'Dataset' {condition}"
+
+# Selects the datasets with the PIDs in a list parameter
+PIDS_CONDITION = "and concat(dvo.protocol, ':', dvo.authority, '/', dvo.identifier) = any(%s)"
+
+# Selects the datasets of which the contents or the permissions (role assignments) were modified at or after a
+# timestamp, given twice as parameter
+MODIFIED_SINCE_CONDITION = "and (dvo.modificationtime >= %s or dvo.permissionmodificationtime >= %s)"
+
+# How far before the high-water mark an incremental update starts reading, so that it does not miss the changes of a
+# transaction that was committed after the mark was taken, but with an earlier modification time
+DEFAULT_MODIFIED_SINCE_MARGIN = timedelta(hours=1)
+
+PIDS_QUERY = "select concat(dvo.protocol, ':', dvo.authority, '/', dvo.identifier) from dvobject dvo " \
+             "where dvo.dtype = 'Dataset'"
+
+# The columns of the datasets table, which can be used in the condition of a query
+COLUMNS = ['pid', 'collection_path', 'version_state', 'file_count', 'total_size', 'modification_time']
+
+
+def get_collection_paths(collections):
+    """ Returns the path of aliases from the root collection, e.g. 'root/dans/ssh', for each collection id, given
+    (id, owner id, alias) for all collections. """
+    owners = {collection_id: (owner_id, alias) for collection_id, owner_id, alias in collections}
+    paths = {}
+
+    def get_path(collection_id):
+        if collection_id not in paths:
+            owner_id, alias = owners[collection_id]
+            paths[collection_id] = alias if owner_id is None or owner_id not in owners \
+                else f"{get_path(owner_id)}/{alias}"
+        return paths[collection_id]
+
+    for collection_id in owners:
+        get_path(collection_id)
+    return paths
+
+
+def read_datasets(database, pids=None, modified_since=None, margin=DEFAULT_MODIFIED_SINCE_MARGIN):
+    """ Reads the records for the dataset index from the Dataverse database, see DatasetIndex.replace_all; for all
+    datasets, only for those with the given PIDs, or only for those whose contents or permissions were modified at or
+    after modified_since (an ISO 8601 timestamp, see get_high_water_mark) minus the margin. """
+    if pids is not None:
+        condition, args = PIDS_CONDITION, ([list(pids)],)
+    elif modified_since is not None:
+        since = datetime.fromisoformat(modified_since) - margin
+        condition, args = MODIFIED_SINCE_CONDITION, ([since, since],)
+    else:
+        condition, args = '', ()
+    collection_paths = get_collection_paths(database.query(COLLECTIONS_QUERY))
+    role_assignees = {}
+    for dataset_id, _, assignee, role in database.stream(ROLE_ASSIGNMENTS_QUERY.format(condition=condition), *args):
+        role_assignees.setdefault(dataset_id, []).append((assignee, role))
+    for dataset_id, pid, owner_id, version_state, file_count, total_size, modification_time, \
+            permission_modification_time in database.stream(DATASETS_QUERY.format(condition=condition), *args):
+        yield {
+            'pid': pid,
+            'collection_path': collection_paths.get(owner_id),
+            'version_state': version_state,
+            'file_count': file_count,
+            'total_size': int(total_size),
+            'modification_time': modification_time.isoformat() if modification_time is not None else None,
+            'role_assignees': role_assignees.get(dataset_id, []),
+            'permission_modification_time': permission_modification_time.isoformat()
+            if permission_modification_time is not None else None,
+        }
+
+
+def read_pids(database):
+    """ Reads the PIDs of all datasets from the Dataverse database. """
+    for row in database.stream(PIDS_QUERY):
+        yield row[0]
+
+
+class DatasetIndex:
+    """ A local catalogue of the datasets in Dataverse, in an SQLite database, so that datasets can be selected without
+    querying the production server. For each dataset the index holds the PID, the path of the collection that it is
+    in, the state of its latest version, the number and total size of the files in that version, the time it was last
+    modified and the users and groups that have a role on it.
+
+    The datasets are in the table 'datasets', with the columns in COLUMNS, and the role assignments are in the table
+    'role_assignments', with the columns pid, assignee and role. The index may be used from multiple threads.
+
+    The latest modification time of the datasets in the index, of their contents or of their permissions, is kept as
+    the high-water mark, so that an update only needs to read the datasets that were modified since, see
+    get_high_water_mark.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def open(self):
+        self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS datasets ('
+                                'pid TEXT PRIMARY KEY, collection_path TEXT, version_state TEXT, file_count INTEGER, '
+                                'total_size INTEGER, modification_time TEXT)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS role_assignments ('
+                                'pid TEXT NOT NULL, assignee TEXT NOT NULL, role TEXT NOT NULL, '
+                                'PRIMARY KEY (pid, assignee, role))')
+        for column in ['collection_path', 'version_state', 'total_size', 'modification_time']:
+            self.connection.execute(f'CREATE INDEX IF NOT EXISTS datasets_{column} ON datasets ({column})')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS role_assignments_assignee '
+                                'ON role_assignments (assignee, role)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS properties (name TEXT PRIMARY KEY, value TEXT)')
+        self.connection.commit()
+
+    def replace_all(self, records):
+        """ Replaces the contents of the index with the records, which are dictionaries with the keys in COLUMNS and
+        'role_assignees', a list of (assignee, role). Other readers see the old contents until all records are in.
+        Returns the number of records. """
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM role_assignments')
+            self.connection.execute('DELETE FROM datasets')
+            self.connection.execute("DELETE FROM properties WHERE name = 'high_water_mark'")
+            return self._insert(records)
+
+    def update(self, records, advance_mark=True):
+        """ Adds the records to the index, replacing those of the same datasets. Returns the number of records. Only
+        if the records are all datasets modified since the high-water mark should advance_mark be True; otherwise the
+        mark could pass datasets that were modified in between and have not been read yet. """
+        with self.lock, self.connection:
+            return self._insert(records, advance_mark)
+
+    def delete(self, pids):
+        """ Removes the datasets from the index. Returns the number of datasets removed. """
+        pids = [(pid,) for pid in pids]
+        with self.lock, self.connection:
+            self.connection.executemany('DELETE FROM role_assignments WHERE pid = ?', pids)
+            return self.connection.executemany('DELETE FROM datasets WHERE pid = ?', pids).rowcount
+
+    def reconcile(self, pids):
+        """ Removes the datasets that are not among the PIDs, e.g. all PIDs in Dataverse, because they were deleted.
+        Returns the number of datasets removed. """
+        pids = set(pids)
+        return self.delete([pid for pid in self.query() if pid not in pids])
+
+    def get_high_water_mark(self):
+        """ Returns the latest modification time of the contents or the permissions of the datasets that were added to
+        the index, or None if none were. """
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM properties WHERE name = 'high_water_mark'").fetchone()
+        return row[0] if row is not None else None
+
+    def _insert(self, records, advance_mark=True):
+        num_records = 0
+        high_water_mark = None
+        for record in records:
+            self.connection.execute('DELETE FROM role_assignments WHERE pid = ?', (record['pid'],))
+            self.connection.execute(f'INSERT OR REPLACE INTO datasets ({", ".join(COLUMNS)}) '
+                                    f'VALUES ({", ".join("?" * len(COLUMNS))})',
+                                    [record[column] for column in COLUMNS])
+            self.connection.executemany('INSERT OR IGNORE INTO role_assignments (pid, assignee, role) '
+                                        'VALUES (?, ?, ?)',
+                                        [(record['pid'], assignee, role)
+                                         for assignee, role in record['role_assignees']])
+            num_records += 1
+            for modification_time in [record['modification_time'], record.get('permission_modification_time')]:
+                if modification_time is not None:
+                    high_water_mark = max(high_water_mark or '', modification_time)
+        if advance_mark and high_water_mark is not None:
+            self.connection.execute("INSERT INTO properties (name, value) VALUES ('high_water_mark', ?) "
+                                    "ON CONFLICT (name) DO UPDATE SET value = max(value, excluded.value)",
+                                    (high_water_mark,))
+        logging.debug(f"Wrote {num_records} records to {self.filename}")
+        return num_records
+
+    def query(self, condition=None, params=(), role_assignment=None):
+        """ Yields the PIDs of the datasets that match the condition, an SQL expression on the columns in COLUMNS,
+        e.g. "version_state = 'DRAFT' and total_size > ?", with a value for each ? in params. With role_assignment,
+        e.g. '@user1=curator', only datasets on which that assignee has that role are returned. """
+        where = []
+        if condition is not None:
+            where.append(f'({condition})')
+        if role_assignment is not None:
+            assignee, role = role_assignment.split('=')
+            where.append('pid IN (SELECT pid FROM role_assignments WHERE assignee = ? AND role = ?)')
+            params = tuple(params) + (assignee, role)
+        sql = 'SELECT pid FROM datasets'
+        if len(where) > 0:
+            sql += f' WHERE {" AND ".join(where)}'
+        with self.lock:
+            rows = self.connection.execute(f'{sql} ORDER BY pid', params).fetchall()
+        for row in rows:
+            yield row[0]
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM datasets').fetchone()[0]
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,9 +1,14 @@
+import itertools
 import json
 import logging
 import re
 
+from datastation.dataverse.dataset_index import DATASETS_QUERY, PIDS_CONDITION, PIDS_QUERY, ROLE_ASSIGNMENTS_QUERY
 from datastation.dataverse.dataverse_client import DataverseClient
 
+# The number of PIDs for which attributes are read from the database with one query
+DEFAULT_CHUNK_SIZE = 1000
+
 
 class Datasets:
 
@@ -87,3 +92,47 @@ class Datasets:
             ]
 
         return attributes
+
+    def get_dataset_attributes_from_database(self, database, pids=None, storage: bool = False,
+                                             user_with_role: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """ Yields the same attributes as get_dataset_attributes, for the datasets with the given PIDs, or for all
+        datasets if pids is None, but reads them from the Dataverse database: with one query per attribute for each
+        chunk of chunk_size PIDs, instead of API calls per dataset. PIDs that are not found are logged and skipped. """
+        if pids is None:
+            yield from self._read_attributes_from_database(database, '', (), storage, user_with_role)
+            return
+
+        pids = iter(pids)
+        while True:
+            chunk = list(itertools.islice(pids, chunk_size))
+            if len(chunk) == 0:
+                return
+            logging.debug(f"Reading attributes of {len(chunk)} datasets")
+            found = {attributes["pid"]: attributes for attributes in
+                     self._read_attributes_from_database(database, PIDS_CONDITION, (chunk,), storage, user_with_role)}
+            for pid in chunk:
+                if pid in found:
+                    yield found[pid]
+                else:
+                    logging.error(f"Dataset {pid} not found in the database")
+
+    @staticmethod
+    def _read_attributes_from_database(database, condition, args, storage, user_with_role):
+        users = {}
+        if user_with_role is not None:
+            for _, pid, assignee, _ in database.stream(
+                    ROLE_ASSIGNMENTS_QUERY.format(condition=f"and dr.alias = %s {condition}"),
+                    (user_with_role, *args)):
+                users.setdefault(pid, []).append(assignee.replace("@", ""))
+        if storage:
+            rows = ((pid, total_size) for _, pid, _, _, _, total_size, _, _ in
+                    database.stream(DATASETS_QUERY.format(condition=condition), args))
+        else:
+            rows = ((pid, None) for pid, in database.stream(f"{PIDS_QUERY} {condition}", args))
+        for pid, size in rows:
+            attributes = {"pid": pid}
+            if storage:
+                attributes["storage"] = int(size)
+            if user_with_role is not None:
+                attributes["users"] = users.get(pid, [])
+            yield attributes
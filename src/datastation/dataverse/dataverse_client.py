@@ -1,4 +1,8 @@
+import os
+
 from datastation.common.database import Database
+from datastation.common.http_cache import HttpCache, DEFAULT_TTL, DEFAULT_MAX_SIZE_MB
+from datastation.common.http_session import create_session
 from datastation.dataverse.banner_api import BannerApi
 from datastation.dataverse.builtin_users import BuiltInUsersApi
 from datastation.dataverse.dataset_api import DatasetApi
@@ -9,35 +13,48 @@ from datastation.dataverse.search_api import SearchApi
 
 
 class DataverseClient:
-    """ A client for the Dataverse API. """
+    """ A client for the Dataverse API. All API objects that it creates share one session, so that connections to the
+    server are reused. The session can be tuned in the optional 'http' section of the configuration.
+
+    With use_cache=True and a 'cache' section in the configuration, the responses to the read-only requests for dataset
+    versions, metadata exports, role assignments and dataverse resources are cached on disk. Only commands that do not
+    modify anything should use the cache, as they may get responses that are up to 'ttl' seconds old. """
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, use_cache: bool = False):
         self.server_url = config['server_url']
         self.api_token = config['api_token']
         self.unblock_key = config['unblock_key'] if 'unblock_key' in config else None
         self.safety_latch = config['safety_latch']
         self.db_config = config['db']
+        self.session = create_session(config.get('http'))
+        self.cache = None
+        if use_cache and 'cache' in config:
+            cache_config = config['cache']
+            self.cache = HttpCache(os.path.expanduser(cache_config['file']),
+                                   ttl=cache_config.get('ttl', DEFAULT_TTL),
+                                   max_size_mb=cache_config.get('max_size_mb', DEFAULT_MAX_SIZE_MB))
 
     def banner(self):
-        return BannerApi(self.server_url, self.api_token, self.unblock_key)
+        return BannerApi(self.server_url, self.api_token, self.unblock_key, self.session)
 
     def search_api(self):
-        return SearchApi(self.server_url, self.api_token)
+        return SearchApi(self.server_url, self.api_token, self.session)
 
     def dataset(self, pid):
-        return DatasetApi(pid, self.server_url, self.api_token, self.unblock_key, self.safety_latch)
+        return DatasetApi(pid, self.server_url, self.api_token, self.unblock_key, self.safety_latch, self.session,
+                          self.cache)
 
     def dataverse(self, alias=None):
-        return DataverseApi(self.server_url, self.api_token, alias)
+        return DataverseApi(self.server_url, self.api_token, alias, self.session, self.cache)
 
     def file(self, file_id):
-        return FileApi(file_id, self.server_url, self.api_token, self.unblock_key, self.safety_latch)
+        return FileApi(file_id, self.server_url, self.api_token, self.unblock_key, self.safety_latch, self.session)
 
     def built_in_users(self, builtin_users_key):
-        return BuiltInUsersApi(self.server_url, self.api_token, builtin_users_key, self.unblock_key)
+        return BuiltInUsersApi(self.server_url, self.api_token, builtin_users_key, self.unblock_key, self.session)
 
     def database(self):
         return Database(self.db_config)
 
     def metrics(self):
-        return MetricsApi(self.server_url)
+        return MetricsApi(self.server_url, self.session)
@@ -1,17 +1,50 @@
+import datetime
 import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-
+from datastation.common.entries import DigestSet
+from datastation.common.http_session import create_session
 from datastation.common.utils import print_dry_run_message, raise_for_status_after_log
 
+# The largest page size that Dataverse allows
+MAX_PER_PAGE = 1000
+
+# The Solr field by which search results are partitioned by date; the publication date for published datasets
+DATE_FIELD = "dateSort"
+
+
+def get_year_partitions(first_year, last_year=None):
+    """
+    Returns filter queries that split the search results by the year of their publication date: one for each year
+    from first_year up to and including last_year (default: the current year), one for everything before and after
+    those years, and one for results without a date. Together they cover all results, each result exactly once.
+    """
+    if last_year is None:
+        last_year = datetime.date.today().year
+
+    def start_of(year):
+        return f"{year:04d}-01-01T00:00:00Z"
+
+    partitions = [f"{DATE_FIELD}:[* TO {start_of(first_year)}}}"]
+    partitions += [f"{DATE_FIELD}:[{start_of(year)} TO {start_of(year + 1)}}}"
+                   for year in range(first_year, last_year + 1)]
+    partitions.append(f"{DATE_FIELD}:[{start_of(last_year + 1)} TO *]")
+    partitions.append(f"-{DATE_FIELD}:[* TO *]")
+    return partitions
+
 
 class SearchApi:
 
-    def __init__(self, server_url, api_token):
+    def __init__(self, server_url, api_token, session=None):
         self.url = f"{server_url}/api/search"
         self.api_token = api_token
+        self.session = session if session is not None else create_session()
 
-    def search(self, query="*", subtree="root", object_type="dataset", dry_run=False, rows=0, start=0):
+    def search(self, query="*", subtree="root", object_type="dataset", dry_run=False, rows=0, start=0, prefetch=4,
+               per_page=25, fields=None, filter_query=None, sort=None, order=None):
         """
         Do a query via the public search API, only published datasets
         using the public search 'API', so no token needed
@@ -25,7 +58,17 @@ class SearchApi:
         :param dry_run: Do not perform the action, but show what would be done.
         :param start: The cursor (zero based result index) indicating where the result page starts
         :param rows: The number of results returned in the 'page'
-                     if zero: 25 rows at a time are read until no more rows are found
+                     if zero: per_page rows at a time are read until no more rows are found
+        :param per_page: The number of rows per page when reading all rows, at most 1000
+        :param fields: The names of the fields to keep in the results, e.g. ['global_id'], or None to keep all fields.
+                       The search API always returns complete results, so the other fields are dropped as soon as a page
+                       is read, which keeps the memory use of prefetched pages low.
+        :param filter_query: A Solr filter query (fq) that the results must also match, e.g. 'dateSort:[* TO NOW]'
+        :param sort: The field to sort on, 'name' or 'date'; Dataverse sorts by relevance by default
+        :param order: The sort order, 'asc' or 'desc'
+        :param prefetch: When reading all rows, the number of pages that are fetched concurrently ahead of the page
+                         whose items are being yielded. The number of pages follows from the total count in the first
+                         page. The items are still yielded in order.
         :return: The search results in a list of dictionaries.
                  Make sure the result is not transformed to an array before feeding it to a batch processor,
                  otherwise all pages are read before processing starts. In other words:
@@ -33,10 +76,10 @@ class SearchApi:
                  but: map(lambda rec: rec['global_id'], dataverse_client.search_api().search())
         """
 
-        if rows == 0:
-            per_page = 25
-        else:
+        if rows != 0:
             per_page = rows
+        if not 0 < per_page <= MAX_PER_PAGE:
+            raise ValueError(f"The number of rows per page must be between 1 and {MAX_PER_PAGE}, not {per_page}")
 
         params = {
             "q": query,
@@ -45,6 +88,12 @@ class SearchApi:
             "per_page": str(per_page),
             "start": str(start),
         }
+        if filter_query is not None:
+            params["fq"] = filter_query
+        if sort is not None:
+            params["sort"] = sort
+        if order is not None:
+            params["order"] = order
 
         headers = {"X-Dataverse-key": self.api_token}
 
@@ -52,20 +101,117 @@ class SearchApi:
             print_dry_run_message(method="GET", url=self.url, headers=headers, params=params)
             return None
 
-        while True:
-            dv_resp = requests.get(self.url, headers=headers, params=params)
-            raise_for_status_after_log(dv_resp)
-
-            data = dv_resp.json()["data"]
-            items = data["items"]
-            logging.debug(f"{len(items)} items, {params}")
-
-            for item in items:
-                logging.debug(f"ITEM: {item}")
-                yield item
-
-            if len(items) < per_page or rows != 0:
-                break
-
-            start += per_page
-            params["start"] = str(start)
+        data = self._get_page(headers, params, start, fields)
+        yield from self._yield_items(data["items"])
+        if len(data["items"]) < per_page or rows != 0:
+            return
+
+        total_count = data["total_count"]
+        start += per_page
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max(prefetch, 1)) as executor:
+            try:
+                while True:
+                    while len(pending) < max(prefetch, 1) and start < total_count:
+                        pending.append(executor.submit(self._get_page, headers, params, start, fields))
+                        start += per_page
+                    if len(pending) > 0:
+                        items = pending.popleft().result()["items"]
+                    else:
+                        # datasets may have been added since the first page was read
+                        items = self._get_page(headers, params, start, fields)["items"]
+                        start += per_page
+                    yield from self._yield_items(items)
+                    if len(items) < per_page:
+                        break
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def search_partitioned(self, partitions, query="*", subtree="root", object_type="dataset", per_page=MAX_PER_PAGE,
+                           fields=None, parallel=4, dry_run=False):
+        """
+        Enumerates all results of a search by splitting it into partitions that are read in parallel, see
+        get_year_partitions. Each partition is read in pages sorted by date, so paging stays shallow and results that
+        are added during the enumeration do not shift the pages of the other partitions. A result that is found in
+        more than one partition, e.g. because it was modified while it was being enumerated, is yielded only once,
+        by its global_id. The results are not yielded in any particular order.
+
+        :param partitions: The Solr filter queries (fq) that together cover all results
+        :param parallel: The number of partitions that are read at the same time
+        :param fields: As for search; the global_id is always read, to remove duplicates
+        :param dry_run: Do not send the requests, but show the first request of each partition
+        :return: The search results, as for search
+        """
+        read_fields = None if fields is None else list(dict.fromkeys(fields + ["global_id"]))
+        if dry_run:
+            for partition in partitions:
+                yield from self.search(query, subtree, object_type, dry_run=True, per_page=per_page, fields=read_fields,
+                                       filter_query=partition, sort="date", order="asc")
+            return
+        results = queue.Queue(maxsize=parallel * per_page)
+        stopped = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read_partition(partition):
+            if stopped.is_set():
+                return
+            try:
+                for item in self.search(query, subtree, object_type, per_page=per_page, fields=read_fields,
+                                        filter_query=partition, sort="date", order="asc", prefetch=1):
+                    if not put(item):
+                        return
+            except Exception as e:
+                logging.error(f"Reading partition {partition} failed: {e}")
+                put(e)
+                return
+            put(done)
+
+        seen = DigestSet()
+        num_duplicates = 0
+        with ThreadPoolExecutor(max_workers=max(parallel, 1)) as executor:
+            try:
+                for partition in partitions:
+                    executor.submit(read_partition, partition)
+                num_done = 0
+                while num_done < len(partitions):
+                    item = results.get()
+                    if item is done:
+                        num_done += 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    elif seen.add(item["global_id"]):
+                        if fields is not None and "global_id" not in fields:
+                            del item["global_id"]
+                        yield item
+                    else:
+                        num_duplicates += 1
+            finally:
+                stopped.set()
+        logging.info(f"Read {len(seen)} results from {len(partitions)} partitions, skipped {num_duplicates} duplicates")
+
+    def _get_page(self, headers, params, start, fields=None):
+        params = dict(params, start=str(start))
+        dv_resp = self.session.get(self.url, headers=headers, params=params)
+        raise_for_status_after_log(dv_resp)
+
+        data = dv_resp.json()["data"]
+        logging.debug(f"{len(data['items'])} items, {params}")
+        if fields is not None:
+            data["items"] = [{field: item[field] for field in fields if field in item} for item in data["items"]]
+        return data
+
+    @staticmethod
+    def _yield_items(items):
+        for item in items:
+            logging.debug(f"ITEM: {item}")
+            yield item
@@ -1,45 +1,141 @@
+import logging
+import threading
+
+from datastation.common.batch_processing import BatchProcessor
 from datastation.common.csv import CsvInput
 from datastation.common.database import Database
 from datastation.dataverse.builtin_users import User
 from datastation.dataverse.dataverse_client import DataverseClient
 
+EXISTING_USERNAMES_QUERY = "SELECT lower(username) FROM builtinuser"
+
+UPDATE_PASSWORD_STATEMENT = \
+    "UPDATE builtinuser SET encryptedpassword = %s, passwordencryptionversion = %s WHERE username = %s"
+
+# The number of users whose passwords are updated in one transaction
+DEFAULT_BATCH_SIZE = 500
 
-def update_password(database, user, encryption_version=1, dry_run=False):
-    update_statement = f"UPDATE builtinuser SET encryptedpassword = '{user.encrypted_password}', passwordencryptionversion = {encryption_version} WHERE username = '{user.username}';"
-    if dry_run:
-        print(f"dry-run, not updating database with {update_statement}")
-    else:
-        database.update(update_statement)
+
+class PasswordUpdater:
+    """ Collects the users whose encrypted password must be stored in the database, and stores them in batches: each
+    batch with one parameterized executemany in one transaction. The remaining users are stored when the updater is
+    closed, also if the import failed, as those users have been created already. Users may be added from multiple
+    threads. """
+
+    def __init__(self, database, encryption_version=1, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.database = database
+        self.encryption_version = encryption_version
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.batch = []
+        self.num_updated = 0
+        self.num_batches = 0
+        self.lock = threading.Lock()
+
+    def add(self, user):
+        with self.lock:
+            self.batch.append(user)
+            if len(self.batch) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if len(self.batch) == 0:
+            return
+        params_seq = [(user.encrypted_password, self.encryption_version, user.username) for user in self.batch]
+        if self.dry_run:
+            print(f"dry-run, not updating the passwords of {len(self.batch)} users with {UPDATE_PASSWORD_STATEMENT}")
+        else:
+            with self.database.transaction():
+                num_updated = self.database.update_many(UPDATE_PASSWORD_STATEMENT, params_seq)
+            if num_updated != len(self.batch):
+                logging.warning(f"Updated {num_updated} passwords for a batch of {len(self.batch)} users")
+            self.num_updated += num_updated
+        self.num_batches += 1
+        logging.info(f"Updated the passwords of {self.num_updated} users in {self.num_batches} batches")
+        self.batch = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 class UserImport:
     """Imports users from a CSV file into a Dataverse instance. The CSV file can be exported from EASY or manually
-    created. The Dataverse instance must have the BuiltinUsers.KEY set. """
+    created. The Dataverse instance must have the BuiltinUsers.KEY set.
+
+    Users whose username already exists in the database are skipped up front. The other users are created by parallel
+    workers, which share the HTTP session of the client, and their passwords are stored in batches, see
+    PasswordUpdater. """
 
     def __init__(self, dataverse_client: DataverseClient, is_easy_format: bool,
-                 builtin_users_key: str, dry_run: bool = False):
+                 builtin_users_key: str, dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                 parallel: int = 1):
         self.dataverse_client = dataverse_client
         self.is_easy_format = is_easy_format
         self.builtin_users_key = builtin_users_key
         self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.num_existing = 0
+        self.num_imported = 0
+        self.num_failed = 0
+        self.lock = threading.Lock()
 
     def import_users(self, csv_file):
         with Database(self.dataverse_client.db_config) as database:
-            with UserCsv(csv_file, is_easy_format=self.is_easy_format) as userCsv:
-                for user in userCsv:
-                    self.import_user(user, self.builtin_users_key, database)
-
-    def import_user(self, user, builtin_users_key, database, dry_run=False):
-        r = self.dataverse_client.built_in_users(builtin_users_key=builtin_users_key).create(user,
-                                                                                             send_email_notification=False,
-                                                                                             dry_run=self.dry_run)
+            existing_usernames = {row[0] for row in database.stream(EXISTING_USERNAMES_QUERY)}
+            logging.info(f"{len(existing_usernames)} users exist already")
+            with PasswordUpdater(database, 0 if self.is_easy_format else 1, self.batch_size,
+                                 self.dry_run) as password_updater:
+                with UserCsv(csv_file, is_easy_format=self.is_easy_format) as userCsv:
+                    users = (user for user in userCsv if not self.exists(user, existing_usernames))
+                    BatchProcessor(wait=0, parallel=self.parallel, fail_on_first_error=False).process_entries(
+                        users, lambda user: self.import_user(user, self.builtin_users_key, password_updater))
+            print(f"Imported {self.num_imported} users, {self.num_failed} failed, {self.num_existing} existed "
+                  f"already; updated the passwords of {password_updater.num_updated} users in "
+                  f"{password_updater.num_batches} batches")
+
+    def exists(self, user, existing_usernames):
+        if user.username.lower() in existing_usernames:
+            print(f"User {user.username} exists already. Skipping it.")
+            self.num_existing += 1
+            return True
+        return False
+
+    def import_user(self, user, builtin_users_key, password_updater):
+        try:
+            r = self.dataverse_client.built_in_users(builtin_users_key=builtin_users_key).create(
+                user, send_email_notification=False, dry_run=self.dry_run)
+        except Exception as e:
+            # counted here, so that the summary includes it; the batch processor logs it and goes on with the next user
+            with self.lock:
+                self.num_failed += 1
+            print(f"Error creating user {user}: {e}")
+            raise
         if r is None:
             return
         if r.status_code == 200:
-            update_password(database, user, 0 if self.is_easy_format else 1, dry_run)
+            password_updater.add(user)
+            with self.lock:
+                self.num_imported += 1
             print(f"Imported user {user.username}")
         else:
-            print(f"Error creating user {user}: {r.status_code} {r.json()['message']}")
+            with self.lock:
+                self.num_failed += 1
+            try:
+                message = r.json()['message']
+            except (ValueError, KeyError):
+                message = r.text
+            print(f"Error creating user {user}: {r.status_code} {message}")
 
 
 class UserCsv(CsvInput):
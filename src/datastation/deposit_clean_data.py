@@ -3,8 +3,8 @@ from datastation.managedeposit.manage_deposit import ManageDeposit
 from datastation.common.config import init
 
 
-def clean_manage_deposit_data(server_url, args):
-    result = ManageDeposit(args).clean_data(server_url)
+def clean_manage_deposit_data(server_url, args, config=None):
+    result = ManageDeposit(args, config).clean_data(server_url)
     if result is not None:
         print(result)
 
@@ -20,7 +20,7 @@ def main():
 
     server_url = config['manage_deposit']['service_baseurl'] + '/delete-deposit'
 
-    clean_manage_deposit_data(server_url, args)
+    clean_manage_deposit_data(server_url, args, config['manage_deposit'])
 
 
 if __name__ == '__main__':
@@ -5,12 +5,13 @@ from datastation.common.send_mail import SendMail
 
 
 class ReportHandler:
-    def __init__(self, server_url, cmd_args):
+    def __init__(self, server_url, cmd_args, config=None):
         self.__server_url = server_url
         self.__command_line_args = cmd_args
+        self.__config = config
 
     def handle_request(self):
-        report = ManageDeposit(self.__command_line_args).create_report(self.__server_url)
+        report = ManageDeposit(self.__command_line_args, self.__config).create_report(self.__server_url)
 
         if report is not None:
             output_file = self.__command_line_args.output_file
@@ -53,7 +54,7 @@ def main():
 
     server_url = config['manage_deposit']['service_baseurl'] + '/report'
 
-    ReportHandler(server_url, args).handle_request()
+    ReportHandler(server_url, args, config['manage_deposit']).handle_request()
 
 
 if __name__ == '__main__':
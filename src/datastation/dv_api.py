@@ -4,8 +4,12 @@ import requests
 
 from lxml import etree
 
+from datastation.common.http_session import create_session
 from datastation.common.utils import raise_for_status_after_log
 
+# shared by the functions below, for its connection pool and default timeouts
+session = create_session()
+
 
 # Thin 'client' functions for http API on the dataverse service, not using a API lib, just the requests lib
 # could be placed in a class that also keeps hold of the url and token that we initialise once!
@@ -38,7 +42,7 @@ def search(server_url, subtree, start=0, rows=10):
 
     # params['fq'] = ''
 
-    dv_resp = requests.get(server_url + '/api/search', params=params)
+    dv_resp = session.get(server_url + '/api/search', params=params)
 
     # give some feedback
     # print("Status code: {}".format(dv_resp.status_code))
@@ -52,7 +56,7 @@ def search(server_url, subtree, start=0, rows=10):
 
 def get_dataset_metadata_export(server_url, pid, exporter = 'dataverse_json', response_is_json = True):
     params = {'exporter': exporter, 'persistentId': pid}
-    dv_resp = requests.get(server_url + '/api/datasets/export',
+    dv_resp = session.get(server_url + '/api/datasets/export',
                            params=params)
 
     # give some feedback
@@ -71,7 +75,7 @@ def get_dataset_metadata_export(server_url, pid, exporter = 'dataverse_json', re
 # with a token, can also get metadata from drafts
 def get_dataset_metadata(server_url, api_token, pid):
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.get(server_url + '/api/datasets/:persistentId/versions/:latest?persistentId=' + pid,
+    dv_resp = session.get(server_url + '/api/datasets/:persistentId/versions/:latest?persistentId=' + pid,
                            headers=headers)
     # Maybe give some more feedback
     # print("Status code: {}".format(dv_resp.status_code))
@@ -86,7 +90,7 @@ def get_dataset_metadata(server_url, api_token, pid):
 def replace_dataset_metadatafield(server_url, api_token, pid, field):
     headers = {'X-Dataverse-key': api_token}
     try:
-        dv_resp = requests.put(
+        dv_resp = session.put(
             server_url + '/api/datasets/:persistentId/editMetadata?persistentId=' + pid + '&replace=true',
             data=json.dumps(field, ensure_ascii=False),
             headers=headers)
@@ -102,7 +106,7 @@ def get_dataset_roleassigments(server_url, api_token, pid):
     headers = {'X-Dataverse-key': api_token}
     params = {'persistentId': pid}
     try:
-        dv_resp = requests.get(server_url + '/api/datasets/:persistentId/assignments',
+        dv_resp = session.get(server_url + '/api/datasets/:persistentId/assignments',
                                params=params,
                                headers=headers)
         raise_for_status_after_log(dv_resp)
@@ -115,7 +119,7 @@ def get_dataset_roleassigments(server_url, api_token, pid):
 
 def delete_dataset_role_assignment(server_url, api_token, pid, assignment_id):
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.delete(server_url + '/api/datasets/:persistentId/assignments/' + str(assignment_id)
+    dv_resp = session.delete(server_url + '/api/datasets/:persistentId/assignments/' + str(assignment_id)
                               + '?persistentId=' + pid,
                               headers=headers)
     raise_for_status_after_log(dv_resp)
@@ -124,7 +128,7 @@ def delete_dataset_role_assignment(server_url, api_token, pid, assignment_id):
 def add_dataset_role_assignment(server_url, api_token, pid, assignment):
     headers = {'X-Dataverse-key': api_token, 'Content-Type': 'application/json'}
     params = {'persistentId': pid}
-    dv_resp = requests.post(server_url + '/api/datasets/:persistentId/assignments/',
+    dv_resp = session.post(server_url + '/api/datasets/:persistentId/assignments/',
                             headers=headers,
                             data=json.dumps(assignment, ensure_ascii=False),
                             params=params)
@@ -132,7 +136,7 @@ def add_dataset_role_assignment(server_url, api_token, pid, assignment):
 
 
 def get_dataset_locks(server_url: str, pid: str):
-    dv_resp = requests.get(server_url + '/api/datasets/:persistentId/locks?persistentId=' + pid)
+    dv_resp = session.get(server_url + '/api/datasets/:persistentId/locks?persistentId=' + pid)
     # give some feedback
     # print("Status code: {}".format(dv_resp.status_code))
     # print("Json: {}".format(dv_resp.json()))
@@ -142,7 +146,7 @@ def get_dataset_locks(server_url: str, pid: str):
     return resp_data
 
 def get_dataset_files(server_url: str, pid: str, version=':latest'):
-    dv_resp = requests.get(server_url + '/api/datasets/:persistentId/versions/' + version + '/files?persistentId=' + pid)
+    dv_resp = session.get(server_url + '/api/datasets/:persistentId/versions/' + version + '/files?persistentId=' + pid)
     # give some feedback
     # print("Status code: {}".format(dv_resp.status_code))
     # print("Json: {}".format(dv_resp.json()))
@@ -153,7 +157,7 @@ def get_dataset_files(server_url: str, pid: str, version=':latest'):
 
 def reingest_file(server_url: str, api_token: str, file_id: str):
     headers = {'X-Dataverse-key': api_token, 'Content-Type': 'application/json'}
-    dv_resp = requests.post(server_url + '/api/files/' + file_id + '/reingest', headers=headers)
+    dv_resp = session.post(server_url + '/api/files/' + file_id + '/reingest', headers=headers)
     raise_for_status_after_log(dv_resp)
     resp_data = dv_resp.json()['data']
     return resp_data
@@ -161,21 +165,21 @@ def reingest_file(server_url: str, api_token: str, file_id: str):
 
 def create_dataset_lock(server_url, api_token, pid, lock_type):
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.post("{}/api/datasets/:persistentId/lock/{}?persistentId={}"
+    dv_resp = session.post("{}/api/datasets/:persistentId/lock/{}?persistentId={}"
                             .format(server_url, lock_type, pid), headers=headers)
     raise_for_status_after_log(dv_resp)
 
 
 def delete_dataset_locks_all(server_url, api_token, pid):
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.delete(server_url + '/api/datasets/:persistentId/locks?persistentId=' + pid,
+    dv_resp = session.delete(server_url + '/api/datasets/:persistentId/locks?persistentId=' + pid,
                               headers=headers)
     raise_for_status_after_log(dv_resp)
 
 
 def delete_dataset_lock(server_url, api_token, pid, lock_type):
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.delete("{}/api/datasets/:persistentId/locks?persistentId={}&type={}"
+    dv_resp = session.delete("{}/api/datasets/:persistentId/locks?persistentId={}&type={}"
                               .format(server_url, pid, lock_type), headers=headers)
     raise_for_status_after_log(dv_resp)
 
@@ -183,7 +187,7 @@ def delete_dataset_lock(server_url, api_token, pid, lock_type):
 def publish_dataset(server_url, api_token, pid, version_upgrade_type="major"):
     # version_upgrade_type must be 'major' or 'minor', indicating which part of next version to increase
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.post(server_url + '/api/datasets/:persistentId/actions/:publish?persistentId='
+    dv_resp = session.post(server_url + '/api/datasets/:persistentId/actions/:publish?persistentId='
                             + pid + '&type=' + version_upgrade_type,
                             headers=headers)
     raise_for_status_after_log(dv_resp)
@@ -192,7 +196,7 @@ def publish_dataset(server_url, api_token, pid, version_upgrade_type="major"):
 # This is via the admin api and does not use the token,
 # but instead will need to be run on localhost or via an SSH tunnel for instance!
 def reindex_dataset(server_url, pid):
-    dv_resp = requests.get(server_url + '/api/admin/index/dataset?persistentId=' + pid)
+    dv_resp = session.get(server_url + '/api/admin/index/dataset?persistentId=' + pid)
     raise_for_status_after_log(dv_resp)
     resp_data = dv_resp.json()['data']
     return resp_data
@@ -202,7 +206,7 @@ def reindex_dataset(server_url, pid):
 # Use mostly while developing and testing with non-production data.
 def delete_dataset_draft(server_url, api_token, pid):
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.delete(server_url + '/api/datasets/:persistentId/versions/:draft?persistentId=' + pid,
+    dv_resp = session.delete(server_url + '/api/datasets/:persistentId/versions/:draft?persistentId=' + pid,
                               headers=headers)
     raise_for_status_after_log(dv_resp)
 
@@ -212,7 +216,7 @@ def delete_dataset_draft(server_url, api_token, pid):
 # The reasons to destroy on production should be extremely rare!
 def destroy_dataset(server_url, api_token, pid):
     headers = {'X-Dataverse-key': api_token}
-    dv_resp = requests.delete(server_url + '/api/datasets/:persistentId/destroy/?persistentId=' + pid,
+    dv_resp = session.delete(server_url + '/api/datasets/:persistentId/destroy/?persistentId=' + pid,
                               headers=headers)
     raise_for_status_after_log(dv_resp)
 
@@ -229,7 +233,7 @@ def get_oai_records(server_url, format, set=None):
     params = {'verb': 'ListRecords', 'metadataPrefix': format}
     if set is not None:
         params['set'] = set
-    dv_resp = requests.get(server_url + '/oai',
+    dv_resp = session.get(server_url + '/oai',
                            params=params)
 
     raise_for_status_after_log(dv_resp)
@@ -243,7 +247,7 @@ def get_oai_records(server_url, format, set=None):
 
 def get_oai_records_resume(server_url, token):
     params = {'verb': 'ListRecords', 'resumptionToken': token}
-    dv_resp = requests.get(server_url + '/oai',
+    dv_resp = session.get(server_url + '/oai',
                            params=params)
 
     raise_for_status_after_log(dv_resp)
@@ -255,7 +259,7 @@ def get_oai_records_resume(server_url, token):
 def change_access_request(server_url, api_token, pid, makeRestricted):
     headers = {'X-Dataverse-key': api_token}
     try:
-        dv_resp = requests.put(
+        dv_resp = session.put(
             server_url + '/api/access/:persistentId/allowAccessRequest?persistentId=' + pid ,
             data=json.dumps(makeRestricted),
             headers=headers)
@@ -271,7 +275,7 @@ def change_access_request(server_url, api_token, pid, makeRestricted):
 def change_file_restrict(server_url, api_token, file_id, makeRestricted):
     headers = {'X-Dataverse-key': api_token}
     try:
-        dv_resp = requests.put(
+        dv_resp = session.put(
             server_url + '/api/files/{}/restrict'.format(file_id),
             data=json.dumps(makeRestricted),
             headers=headers)
@@ -286,7 +290,7 @@ def change_file_restrict(server_url, api_token, file_id, makeRestricted):
 def replace_dataset_metadata(server_url, api_token, pid, json_data):
     headers = {'X-Dataverse-key': api_token}
     try:
-        dv_resp = requests.put(
+        dv_resp = session.put(
             server_url + '/api/datasets/:persistentId/metadata?persistentId=' + pid + '&replace=true',
             data=json_data,
             headers=headers)
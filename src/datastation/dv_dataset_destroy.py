@@ -3,7 +3,7 @@ from datetime import datetime
 
 from datastation.common.batch_processing import BatchProcessor, get_pids, BatchProcessorWithReport
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 
 
@@ -35,7 +35,7 @@ def main():
     args = parser.parse_args()
 
     dataverse_client = DataverseClient(config['dataverse'])
-    batch_processor = BatchProcessorWithReport(wait=args.wait, report_file=args.report_file)
+    batch_processor = BatchProcessorWithReport(**batch_processor_kwargs(args, fail_on_first_error=True))
     destroy_datasets(args, dataverse_client, batch_processor, dry_run=args.dry_run)
 
 
@@ -2,7 +2,7 @@ import argparse
 
 from datastation.common.batch_processing import get_pids, BatchProcessorWithReport
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 from datastation.dataverse.destroy_placeholder_dataset import destroy_placeholder_dataset
 
@@ -21,8 +21,8 @@ def main():
     add_dry_run_arg(parser)
     args = parser.parse_args()
 
-    batch_processor = BatchProcessorWithReport(wait=args.wait, report_file=args.report_file,
-                                               headers=['PID', 'Destroyed', 'Messages'])
+    batch_processor = BatchProcessorWithReport(headers=['PID', 'Destroyed', 'Messages'],
+                                               **batch_processor_kwargs(args, fail_on_first_error=True))
     pids = get_pids(args.pid_or_pids_file)
     description_text_pattern = config['migration_placeholders']['description_text_pattern']
     batch_processor.process_pids(pids,
@@ -4,7 +4,7 @@ from os.path import expanduser, isfile
 
 from datastation.common.batch_processing import BatchProcessor
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg
 from datastation.dataverse.datasets import Datasets
 from datastation.dataverse.dataverse_client import DataverseClient
 
@@ -39,7 +39,7 @@ def main():
     def run(obj_list):
         client = DataverseClient(config['dataverse'])
         datasets = Datasets(client, dry_run=args.dry_run)
-        batch_processor = BatchProcessor(wait=args.wait, fail_on_first_error=args.fail_fast)
+        batch_processor = BatchProcessor(**batch_processor_kwargs(args, report=False))
         batch_processor.process_entries(obj_list, lambda obj: datasets.update_metadata(data=obj, replace=args.replace))
 
     def parse_value_args():
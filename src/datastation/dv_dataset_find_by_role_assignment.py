@@ -2,23 +2,21 @@ import argparse
 import logging
 
 from datastation.common.config import init
+from datastation.dataverse.dataset_index import ROLE_ASSIGNMENTS_QUERY
 from datastation.dataverse.dataverse_client import DataverseClient
 
 
 def find_datasets_by_role_assignment(database, role_assignment):
     [role_assignee, role_alias] = role_assignment.split('=')
     logging.debug(f"role_assignee={role_assignee}, role_alias={role_alias}")
-    select_statement = \
-        f"select concat(dvo.protocol, ':', dvo.authority, '/', dvo.identifier) " \
-        f"from roleassignment ra inner join dataverserole dr on ra.role_id=dr.id " \
-        f"inner join dvobject dvo on definitionpoint_id=dvo.id " \
-        f"where dtype='Dataset' and assigneeidentifier='{role_assignee}' and alias='{role_alias}'"
+    select_statement = ROLE_ASSIGNMENTS_QUERY.format(condition="and ra.assigneeidentifier = %s and dr.alias = %s")
     logging.debug(f"select_statement={select_statement}")
-    result = database.query(select_statement)
-    if len(result) == 0:
+    num_datasets = 0
+    for r in database.stream(select_statement, (role_assignee, role_alias)):
+        print(r[1], flush=True)
+        num_datasets += 1
+    if num_datasets == 0:
         print(f"No datasets for user {role_assignee} with role {role_alias}")
-    for r in result:
-        print(r[0])
 
 
 def main():
@@ -1,11 +1,13 @@
 import argparse
 import json
+import sys
 
 from datastation.common.batch_processing import get_entries, BatchProcessor
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg, add_no_cache_arg
 from datastation.dataverse.datasets import Datasets
 from datastation.dataverse.dataverse_client import DataverseClient
+from datastation.dataverse.search_api import get_year_partitions
 
 
 def main():
@@ -24,9 +26,20 @@ def main():
                        help="The dataset pid, or a file with a list of pids", )
     group.add_argument("--all", dest="all_datasets", action="store_true", required=False,
                        help="All datasets in the dataverse", )
+    parser.add_argument("--partition-from-year", dest="partition_from_year", type=int,
+                        help="With --all: enumerate the datasets in parallel partitions, one per publication year from "
+                             "this year on, instead of paging through one long search result", )
+
+    parser.add_argument("--source", dest="source", choices=['api', 'db'], default='api',
+                        help="Where to read the attributes: from the Dataverse API, one dataset at a time, or from the "
+                             "Dataverse database, many datasets per query (default: api). With db, --all selects every "
+                             "dataset in the database, including drafts and deaccessioned datasets, whereas with api "
+                             "it selects the datasets found by a search; --dry-run and the batch processing options "
+                             "cannot be used with db", )
 
     add_batch_processor_args(parser, report=False)
     add_dry_run_arg(parser)
+    add_no_cache_arg(parser)
 
     args = parser.parse_args()
 
@@ -36,18 +49,43 @@ def main():
     }
     if set(attribute_options.values()) == {None, False}:
         parser.error(f"Add at least one of the arguments: {', '.join(attribute_options.keys())}")
+    if args.partition_from_year is not None and not args.all_datasets:
+        parser.error("--partition-from-year can only be used with --all")
+    if args.source == 'db':
+        # the database is read with a few queries, not one dataset at a time, so these options have no meaning
+        options = {'--dry-run': 'dry_run', '--wait-between-items': 'wait', '--fail-fast': 'fail_fast',
+                   '--parallel': 'parallel', '--rate': 'rate', '--adaptive': 'adaptive',
+                   '--max-attempts': 'max_attempts', '--progress': 'progress', '--max-duration': 'max_duration',
+                   '--failed-out': 'failed_out', '--entry-timeout': 'entry_timeout'}
+        given = [option for option, dest in options.items() if getattr(args, dest) != parser.get_default(dest)]
+        if len(given) > 0:
+            parser.error(f"--source db cannot be used with {', '.join(given)}")
 
-    dataverse_client = DataverseClient(config["dataverse"])
+    dataverse_client = DataverseClient(config["dataverse"], use_cache=not args.no_cache)
 
     datasets = Datasets(dataverse_client, dry_run=args.dry_run)
-    if args.all_datasets:
-        search_result = dataverse_client.search_api().search(dry_run=args.dry_run)
+    if args.source == 'db':
+        pids = None if args.all_datasets else get_entries(args.pid_or_pids_file)
+        with dataverse_client.database() as database:
+            for attributes in datasets.get_dataset_attributes_from_database(database, pids, **attribute_options):
+                print(json.dumps(attributes))
+        return
+
+    if args.all_datasets and args.partition_from_year is not None:
+        search_result = dataverse_client.search_api().search_partitioned(
+            get_year_partitions(args.partition_from_year), fields=['global_id'], dry_run=args.dry_run)
+        pids = map(lambda rec: rec['global_id'], search_result)  # lazy iterator
+    elif args.all_datasets:
+        search_result = dataverse_client.search_api().search(dry_run=args.dry_run, per_page=1000,
+                                                             fields=['global_id'])
         pids = map(lambda rec: rec['global_id'], search_result)  # lazy iterator
     else:
         pids = get_entries(args.pid_or_pids_file)
-    BatchProcessor(wait=args.wait, fail_on_first_error=args.fail_fast).process_entries(
+    BatchProcessor(**batch_processor_kwargs(args, report=False)).process_entries(
         pids,
         lambda pid: print(json.dumps(datasets.get_dataset_attributes(pid, **attribute_options), skipkeys=True)))
+    if dataverse_client.cache is not None:
+        print(dataverse_client.cache.get_summary(), file=sys.stderr)
 
 
 if __name__ == "__main__":
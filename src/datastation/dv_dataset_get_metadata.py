@@ -5,7 +5,7 @@ import sys
 import rich
 
 from datastation.common.config import init
-from datastation.common.utils import add_dry_run_arg
+from datastation.common.utils import add_dry_run_arg, add_no_cache_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 
 
@@ -17,9 +17,10 @@ def main():
     parser.add_argument('-o', '--output-file', dest='output_file', default='-',
                         help='the file to write the output to or - for stdout')
     add_dry_run_arg(parser)
+    add_no_cache_arg(parser)
 
     args = parser.parse_args()
-    dataverse = DataverseClient(config['dataverse'])
+    dataverse = DataverseClient(config['dataverse'], use_cache=not args.no_cache)
     try:
         metadata = dataverse.dataset(args.pid).get_metadata(args.version, dry_run=args.dry_run)
         if args.output_file == '-':
@@ -30,6 +31,8 @@ def main():
         print(f"Retrieved metadata for dataset {args.pid} version {args.version}", file=sys.stderr)
     except Exception as e:
         print(f"Error retrieving metadata: {e}")
+    if dataverse.cache is not None:
+        print(dataverse.cache.get_summary(), file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -1,9 +1,10 @@
 import argparse
 import os
+import sys
 
 from datastation.common.batch_processing import BatchProcessor, get_pids
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg, add_no_cache_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 
 exporter_to_extension = {
@@ -33,7 +34,6 @@ def get_metadata_export(args, pid, dataverse):
 
 def main():
     config = init()
-    dataverse = DataverseClient(config['dataverse'])
 
     parser = argparse.ArgumentParser(description='Get metadata export for a dataset. Note that Dataverse currently '
                                                  'only supports getting metadata exports for the latest published '
@@ -51,12 +51,16 @@ def main():
                         dest='output_dir')
     add_batch_processor_args(parser)
     add_dry_run_arg(parser)
+    add_no_cache_arg(parser)
 
     args = parser.parse_args()
-    batch_processor = BatchProcessor(wait=args.wait, fail_on_first_error=args.fail_fast)
+    dataverse = DataverseClient(config['dataverse'], use_cache=not args.no_cache)
+    batch_processor = BatchProcessor(**batch_processor_kwargs(args, report=False))
     pids = get_pids(args.pid_or_pids_file)
     batch_processor.process_pids(pids,
                                  callback=lambda pid: get_metadata_export(args, pid, dataverse))
+    if dataverse.cache is not None:
+        print(dataverse.cache.get_summary(), file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,97 @@
+import argparse
+import logging
+import os
+
+from datastation.common.batch_processing import get_entries
+from datastation.common.config import init
+from datastation.dataverse.dataset_index import DatasetIndex, read_datasets, read_pids, COLUMNS
+from datastation.dataverse.dataverse_client import DataverseClient
+
+
+def build_index(args, dataverse_client, index):
+    with dataverse_client.database() as database:
+        num_datasets = index.replace_all(read_datasets(database))
+    print(f"Indexed {num_datasets} datasets in {index.filename}")
+
+
+def update_index(args, dataverse_client, index):
+    if args.pid_or_pids_file is None:
+        update_index_incrementally(dataverse_client, index)
+        return
+    pids = list(get_entries(args.pid_or_pids_file))
+    with dataverse_client.database() as database:
+        records = list(read_datasets(database, pids))
+    # only the incremental update may advance the high-water mark
+    num_updated = index.update(records, advance_mark=False)
+    # datasets that are no longer in Dataverse
+    found = {record['pid'] for record in records}
+    num_deleted = index.delete([pid for pid in pids if pid not in found])
+    print(f"Updated {num_updated} and removed {num_deleted} datasets in {index.filename}")
+
+
+def update_index_incrementally(dataverse_client, index):
+    high_water_mark = index.get_high_water_mark()
+    if high_water_mark is None:
+        raise RuntimeError(f"{index.filename} has no modification times yet; build the index first")
+    with dataverse_client.database() as database:
+        num_updated = index.update(read_datasets(database, modified_since=high_water_mark))
+        num_deleted = index.reconcile(read_pids(database))
+    print(f"Updated {num_updated} datasets modified since {high_water_mark} and removed {num_deleted} deleted "
+          f"datasets in {index.filename}")
+
+
+def query_index(args, dataverse_client, index):
+    for pid in index.query(args.condition, role_assignment=args.role_assignment):
+        print(pid, flush=True)
+
+
+def main():
+    config = init()
+    parser = argparse.ArgumentParser(description="Maintains a local index of the datasets in Dataverse, from which "
+                                                 "datasets can be selected without querying Dataverse. The PIDs "
+                                                 "printed by the query command can be piped into the other dv-dataset "
+                                                 "commands by passing - as their input file.")
+    parser.add_argument('--index-file', dest='index_file',
+                        help="The SQLite file with the index (default: dataset_index.file in the configuration)")
+    parser.set_defaults(func=None)
+
+    subparsers = parser.add_subparsers()
+    parser_build = subparsers.add_parser('build', help="Build the index from scratch, from the Dataverse database")
+    parser_build.set_defaults(func=build_index)
+
+    parser_update = subparsers.add_parser('update', help="Update the index with the datasets that were modified or "
+                                                         "deleted since the last build or update, or only for the "
+                                                         "given datasets")
+    parser_update.add_argument('pid_or_pids_file', nargs='?',
+                               help="The dataset pid, or a file with a list of pids; default: all datasets modified "
+                                    "since the latest modification time in the index")
+    parser_update.set_defaults(func=update_index)
+
+    parser_query = subparsers.add_parser('query', help="Print the PIDs of the datasets in the index that match a "
+                                                       "condition")
+    parser_query.add_argument('condition', nargs='?',
+                              help=f"An SQL condition on the columns {', '.join(COLUMNS)}, "
+                                   f"e.g. \"version_state = 'DRAFT' and total_size > 1e9\"; default: all datasets")
+    parser_query.add_argument('--role-assignment', dest='role_assignment',
+                              help="Only datasets with this role assignment, e.g. \"@user1=curator\"")
+    parser_query.set_defaults(func=query_index)
+
+    args = parser.parse_args()
+    if args.func is None:
+        parser.print_help()
+        return
+
+    index_file = args.index_file
+    if index_file is None:
+        if 'dataset_index' not in config['dataverse']:
+            parser.error("No --index-file given and no dataset_index section in the dataverse configuration")
+        index_file = config['dataverse']['dataset_index']['file']
+
+    dataverse_client = DataverseClient(config['dataverse'])
+    with DatasetIndex(os.path.expanduser(index_file)) as index:
+        args.func(args, dataverse_client, index)
+        logging.info(f"{index.count()} datasets in {index.filename}")
+
+
+if __name__ == '__main__':
+    main()
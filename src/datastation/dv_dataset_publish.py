@@ -4,15 +4,14 @@ from datetime import datetime
 
 from datastation.common.batch_processing import BatchProcessorWithReport, get_pids
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 
 
 def publish_datasets(args, dataverse_client: DataverseClient):
     pids = get_pids(args.pid_or_pid_file)
-    batch_processor = BatchProcessorWithReport(report_file=args.report_file, wait=args.wait,
-                                               fail_on_first_error=args.fail_fast,
-                                               headers=['DOI', 'Modified', 'Change', 'Messages'])
+    batch_processor = BatchProcessorWithReport(headers=['DOI', 'Modified', 'Change', 'Messages'],
+                                               **batch_processor_kwargs(args))
     batch_processor.process_pids(pids,
                                  lambda pid, csv_report: publish(pid, dataverse_client,
                                                                  update_type=args.update_type,
@@ -5,16 +5,15 @@ import rich
 
 from datastation.common.batch_processing import get_pids, BatchProcessorWithReport
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg
 from datastation.dataverse.dataset_api import DatasetApi
 from datastation.dataverse.dataverse_client import DataverseClient
 
 
 def add_role_assignments(args, dataverse_client: DataverseClient):
     pids = get_pids(args.pid_or_pid_file)
-    batch_processor = BatchProcessorWithReport(wait=args.wait, fail_on_first_error=args.fail_fast,
-                                               report_file=args.report_file,
-                                               headers=['DOI', 'Modified', 'Assignee', 'Role', 'Change'])
+    batch_processor = BatchProcessorWithReport(headers=['DOI', 'Modified', 'Assignee', 'Role', 'Change'],
+                                               **batch_processor_kwargs(args))
     batch_processor.process_pids(pids,
                                  lambda pid, csv_report: add_role_assignment(args.role_assignment,
                                                                              dataset_api=dataverse_client.dataset(pid),
@@ -56,8 +55,8 @@ def list_role_assignments(args, dataverse_client):
 
 def remove_role_assignments(args, dataverse_client: DataverseClient):
     pids = get_pids(args.pid_or_pid_file)
-    batch_processor = BatchProcessorWithReport(wait=args.wait, report_file=args.report_file,
-                                               headers=['DOI', 'Modified', 'Assignee', 'Role', 'Change'])
+    batch_processor = BatchProcessorWithReport(headers=['DOI', 'Modified', 'Assignee', 'Role', 'Change'],
+                                               **batch_processor_kwargs(args, fail_on_first_error=True))
     batch_processor.process_pids(pids,
                                  lambda pid, csv_report: remove_role_assignment(args.role_assignment,
                                                                                 dataset_api=dataverse_client.dataset(
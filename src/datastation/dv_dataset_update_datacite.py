@@ -6,14 +6,13 @@ from requests import HTTPError
 from datastation.common.batch_processing import get_pids, BatchProcessorWithReport
 from datastation.common.config import init
 from datastation.common.csv import CsvReport
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 
 
 def update_datacite_records(args, dataverse_client: DataverseClient):
     pids = get_pids(args.pid_or_pids_file)
-    batch_processor = BatchProcessorWithReport(wait=args.wait, fail_on_first_error=args.fail_fast,
-                                               report_file=args.report_file, headers=["PID", "Status", "Message"])
+    batch_processor = BatchProcessorWithReport(headers=["PID", "Status", "Message"], **batch_processor_kwargs(args))
     batch_processor.process_pids(pids,
                                  lambda pid, csv_report: update_datacite_record(pid, dataverse_client,
                                                                                 csv_report=csv_report,
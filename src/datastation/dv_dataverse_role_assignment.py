@@ -2,7 +2,7 @@ import argparse
 
 from datastation.common.batch_processing import get_entries, BatchProcessorWithReport
 from datastation.common.config import init
-from datastation.common.utils import add_batch_processor_args, add_dry_run_arg
+from datastation.common.utils import add_batch_processor_args, batch_processor_kwargs, add_dry_run_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 from datastation.dataverse.roles import DataverseRole
 
@@ -36,12 +36,8 @@ def remove_role_assignments(args, dataverse_client: DataverseClient):
 
 
 def create_batch_processor(args):
-    return BatchProcessorWithReport(
-        wait=args.wait,
-        fail_on_first_error=args.fail_fast,
-        report_file=args.report_file,
-        headers=['alias', 'Modified', 'Assignee', 'Role', 'Change']
-    )
+    return BatchProcessorWithReport(headers=['alias', 'Modified', 'Assignee', 'Role', 'Change'],
+                                    **batch_processor_kwargs(args))
 
 
 def main():
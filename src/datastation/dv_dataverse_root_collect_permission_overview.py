@@ -1,8 +1,10 @@
 import argparse
+import sys
+
 from argparse_formatter import FlexiFormatter
 
 from datastation.common.config import init
-from datastation.common.utils import add_dry_run_arg
+from datastation.common.utils import add_dry_run_arg, add_no_cache_arg
 from datastation.dataverse.dataverse_client import DataverseClient
 from datastation.dataverse.permissions_collect import PermissionsCollect
 
@@ -35,12 +37,15 @@ def main():
     parser.add_argument('-s', '--selected-dataverse', dest='selected_dataverse', default=None,
                         help='The dataverse (top-level) sub-tree to collect the permissions for, by default all dataverses are collected')
     add_dry_run_arg(parser)
+    add_no_cache_arg(parser)
     args = parser.parse_args()
 
     selected_dataverse = args.selected_dataverse
-    dataverse_client = DataverseClient(config['dataverse'])
+    dataverse_client = DataverseClient(config['dataverse'], use_cache=not args.no_cache)
     collector = PermissionsCollect(dataverse_client, args.output_file, args.format, args.dry_run)
     collector.collect_permissions_info_overview(selected_dataverse)
+    if dataverse_client.cache is not None:
+        print(dataverse_client.cache.get_summary(), file=sys.stderr)
 
 if __name__ == '__main__':
     main()
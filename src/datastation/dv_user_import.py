@@ -1,9 +1,9 @@
 import argparse
 
 from datastation.common.config import init
-from datastation.common.utils import add_dry_run_arg
+from datastation.common.utils import add_dry_run_arg, positive_int_argument_converter
 from datastation.dataverse.dataverse_client import DataverseClient
-from datastation.dataverse.user_import import UserImport
+from datastation.dataverse.user_import import UserImport, DEFAULT_BATCH_SIZE
 
 
 def main():
@@ -18,12 +18,18 @@ def main():
                         action='store_true')
     parser.add_argument('-k', '--builtin-users-key', help="BuiltinUsers.KEY set in Dataverse")
     parser.add_argument('-i', '--input-csv', help="the csv file containing the users and hashed passwords")
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"the number of users whose passwords are stored in one database transaction "
+                             f"(default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--parallel', default=1, type=positive_int_argument_converter,
+                        help="number of users to create concurrently (default: 1)", dest='parallel')
     add_dry_run_arg(parser)
 
     args = parser.parse_args()
     dataverse_client = DataverseClient(config['dataverse'])
     user_import = UserImport(dataverse_client, builtin_users_key=args.builtin_users_key,
-                             is_easy_format=args.is_easy_format, dry_run=args.dry_run)
+                             is_easy_format=args.is_easy_format, dry_run=args.dry_run, batch_size=args.batch_size,
+                             parallel=args.parallel)
     user_import.import_users(args.input_csv)
 
 
@@ -5,8 +5,7 @@ import shutil
 import stat
 from pathlib import Path
 
-import requests
-
+from datastation.common.http_session import create_session
 from datastation.common.utils import has_file_pred, has_dirtree_pred, is_sub_path_of, get_size, sizeof_fmt, \
     set_permissions, expand_path, have_subdirs_pred
 
@@ -32,6 +31,7 @@ class IngestFlow:
         self.deposits_dir_mode = config['deposits_mode']['directory']
         self.deposits_group = config['deposits_group']
         self.dry_run = dry_run
+        self.session = create_session(config.get('http'))
 
     def set_dry_run(self, dry_run: bool):
         self.dry_run = dry_run
@@ -67,7 +67,7 @@ class IngestFlow:
             logging.info("DRY-RUN: only printing command, not sending it...")
             print(json.dumps(command, indent=2))
         else:
-            r = requests.post(f'{self.service_baseurl}/{"migrations" if is_migration else "imports"}/:start',
+            r = self.session.post(f'{self.service_baseurl}/{"migrations" if is_migration else "imports"}/:start',
                               json=command)
             print(f'Server responded: {r.text}')
 
@@ -78,7 +78,7 @@ class IngestFlow:
             logging.info("DRY-RUN: only printing command, not sending it...")
             print(f'Request: POST {url}')
         else:
-            r = requests.post(url)
+            r = self.session.post(url)
             payload = r.json()
 
             if 'message' not in payload:
@@ -96,7 +96,7 @@ class IngestFlow:
             logging.info("DRY-RUN: only printing command, not sending it...")
             print(f'Request: DELETE {url}')
         else:
-            r = requests.delete(url)
+            r = self.session.delete(url)
             payload = r.json()
 
             if 'message' not in payload:
@@ -119,7 +119,7 @@ class IngestFlow:
             logging.info("DRY-RUN: only printing command, not sending it...")
             print(f'Request: GET {url}')
         else:
-            r = requests.get(url, params=params)
+            r = self.session.get(url, params=params)
             print(r.text)
 
     def progress_report(self, batch_dir):
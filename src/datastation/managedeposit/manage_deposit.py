@@ -1,13 +1,16 @@
 import requests
 
+from datastation.common.http_session import create_session
+
 
 class ManageDeposit:
     """ Get python script input arguments and
             convert them to HTTP request parameters and headers and
             submit the request"""
 
-    def __init__(self, cmd_args):
+    def __init__(self, cmd_args, config: dict = None):
         self.__cmd_args = cmd_args
+        self.__session = create_session(config.get('http') if config is not None else None)
         self.__payload = {'user': cmd_args.user, 'state': cmd_args.state,
                           'startdate': cmd_args.startdate, 'enddate': cmd_args.enddate}
         self.__headers = dict()
@@ -20,7 +23,7 @@ class ManageDeposit:
 
     def create_report(self, server_url):
         self.compose_headers()
-        response = requests.get(server_url, self.__payload, headers=self.__headers)
+        response = self.__session.get(server_url, params=self.__payload, headers=self.__headers)
 
         if response.status_code == requests.codes.ok:
             return response.text
@@ -29,7 +32,7 @@ class ManageDeposit:
         return None
 
     def clean_data(self, server_url):
-        response = requests.post(server_url, params=self.__payload)
+        response = self.__session.post(server_url, params=self.__payload)
 
         if response.status_code == requests.codes.ok:
             return response.text
@@ -1,5 +1,4 @@
-import requests
-
+from datastation.common.http_session import create_session
 from datastation.common.utils import print_dry_run_message
 
 
@@ -7,6 +6,7 @@ class VerifyDatasetService:
 
     def __init__(self, config):
         self.base_url = config['url']
+        self.session = create_session(config.get('http'))
 
     def verify_dataset(self, pid, dry_run=False):
         url = f'{self.base_url}/verify'
@@ -16,6 +16,6 @@ class VerifyDatasetService:
             print_dry_run_message(method='POST', url=url, headers=headers, json=json)
             return None
         else:
-            r = requests.post(url, headers=headers, json=json)
+            r = self.session.post(url, headers=headers, json=json)
 
         return r.json()
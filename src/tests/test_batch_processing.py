@@ -1,7 +1,17 @@
+import gzip
+import io
+import os
+import signal
+import threading
 import time
 from datetime import datetime
 
-from datastation.common.batch_processing import BatchProcessor, get_pids
+import pytest
+import requests
+
+from datastation.common.batch_processing import BatchProcessor, get_pids, BatchProcessorWithReport
+from datastation.common.http_session import get_remaining_time
+from datastation.common.retry import RetryPolicy
 
 
 class TestBatchProcessor:
@@ -50,8 +60,8 @@ class TestBatchProcessor:
         batch_processor.process_pids(objects, lambda obj: print(obj))
         assert capsys.readouterr().out == ""
         assert caplog.text == (
-            'INFO     root:batch_processing.py:62 Start batch processing on unknown number of entries\n'
-            'INFO     root:batch_processing.py:91 Batch processing ended: 0 entries processed\n')
+            'INFO     root:batch_processing.py:131 Start batch processing on unknown number of entries\n'
+            'INFO     root:batch_processing.py:163 Batch processing ended: 0 entries processed\n')
         assert len(caplog.records) == 2
         assert (caplog.records[0].message == 'Start batch processing on unknown number of entries')
         assert (caplog.records[1].message == 'Batch processing ended: 0 entries processed')
@@ -62,8 +72,8 @@ class TestBatchProcessor:
         batch_processor.process_entries(['a'], lambda obj: print(obj))
         assert capsys.readouterr().out == "a\n"
         assert caplog.text == (
-            'INFO     root:batch_processing.py:60 Start batch processing on 1 entries\n'
-            'INFO     root:batch_processing.py:91 Batch processing ended: 1 entries processed\n')
+            'INFO     root:batch_processing.py:133 Start batch processing on 1 entries\n'
+            'INFO     root:batch_processing.py:163 Batch processing ended: 1 entries processed\n')
         assert len(caplog.records) == 2
         assert (caplog.records[0].message == 'Start batch processing on 1 entries')
         assert (caplog.records[1].message == 'Batch processing ended: 1 entries processed')
@@ -73,7 +83,7 @@ class TestBatchProcessor:
         batch_processor = BatchProcessor()
         batch_processor.process_pids(None, lambda obj: print(obj))
         assert capsys.readouterr().out == ""
-        assert caplog.text == 'INFO     root:batch_processing.py:56 Nothing to process\n'
+        assert caplog.text == 'INFO     root:batch_processing.py:122 Nothing to process\n'
         assert len(caplog.records) == 1
         assert (caplog.records[0].message == 'Nothing to process')
 
@@ -82,8 +92,8 @@ class TestBatchProcessor:
         batch_processor = BatchProcessor()
         batch_processor.process_pids([], lambda obj: print(obj))
         assert capsys.readouterr().out == ""
-        assert caplog.text == ('INFO     root:batch_processing.py:60 Start batch processing on 0 entries\n'
-                               'INFO     root:batch_processing.py:91 Batch processing ended: 0 entries '
+        assert caplog.text == ('INFO     root:batch_processing.py:133 Start batch processing on 0 entries\n'
+                               'INFO     root:batch_processing.py:163 Batch processing ended: 0 entries '
                                'processed\n')
         assert len(caplog.records) == 2
         assert (caplog.records[0].message == 'Start batch processing on 0 entries')
@@ -188,6 +198,257 @@ class TestBatchProcessor:
         assert (caplog.records[6].message == 'Waiting 0.1 seconds before processing next entry')
         # see other tests for other lines
 
+    def test_process_pids_in_parallel(self, capsys, caplog):
+        caplog.set_level('INFO')
+        batch_processor = BatchProcessor(wait=0, parallel=3)
+        pids = ["a", "b", "c", "d", "e", "f"]
+
+        def slow_print(pid):
+            time.sleep(0.2)
+            print(pid)
+
+        start_time = datetime.now()
+        batch_processor.process_pids(pids, slow_print)
+        end_time = datetime.now()
+        captured = capsys.readouterr()
+        assert sorted(captured.out.split()) == pids
+        assert (end_time - start_time).total_seconds() < 1.0
+        assert (caplog.records[0].message == 'Start batch processing on 6 entries')
+        assert (caplog.records[1].message == 'Processing entries on 3 workers')
+        assert (caplog.records[-1].message == 'Batch processing ended: 6 entries processed')
+
+    def test_parallel_stops_on_first_error(self, caplog):
+        caplog.set_level('INFO')
+        processed = []
+
+        def raise_first(pid):
+            if pid == "a":
+                raise Exception("a is not allowed")
+            time.sleep(0.1)
+            processed.append(pid)
+
+        batch_processor = BatchProcessor(wait=0, parallel=2)
+        pids = map(lambda pid: pid, ["a", "b", "c", "d", "e", "f", "g", "h"])
+        batch_processor.process_pids(pids, raise_first)
+        assert len(processed) < 7
+        assert 'Stop processing because of an exception: a is not allowed' in caplog.messages
+        assert caplog.records[-1].message.startswith('Batch processing ended')
+
+    def test_parallel_continues_after_error(self, caplog):
+        processed = []
+
+        def raise_first(pid):
+            if pid == "a":
+                raise Exception("a is not allowed")
+            processed.append(pid)
+
+        batch_processor = BatchProcessor(wait=0, fail_on_first_error=False, parallel=2)
+        batch_processor.process_pids(["a", "b", "c", "d"], raise_first)
+        assert sorted(processed) == ["b", "c", "d"]
+
+    def test_parallel_with_report(self, tmp_path):
+        report_file = tmp_path / "report.csv"
+        batch_processor = BatchProcessorWithReport(report_file=str(report_file), headers=["PID", "Status"],
+                                                   wait=0, parallel=4)
+        pids = [f"pid-{i}" for i in range(100)]
+        batch_processor.process_pids(pids, lambda pid, csv_report: csv_report.write({"PID": pid, "Status": "OK"}))
+        with open(report_file) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == "PID,Status"
+        assert sorted(lines[1:]) == sorted(f"{pid},OK" for pid in pids)
+
+    def test_resume_skips_done_entries(self, tmp_path, caplog):
+        caplog.set_level('INFO')
+        report_file = str(tmp_path / "report.csv")
+
+        def write_or_fail(pid, csv_report, fail_on):
+            if pid == fail_on:
+                raise Exception(f"{pid} is not allowed")
+            csv_report.write({"PID": pid, "Status": "OK"})
+
+        BatchProcessorWithReport(report_file=report_file, headers=["PID", "Status"], wait=0).process_pids(
+            ["a", "b", "c"], lambda pid, csv_report: write_or_fail(pid, csv_report, fail_on="b"))
+        assert (tmp_path / "report.csv.journal").exists()
+
+        caplog.clear()
+        processed = []
+        BatchProcessorWithReport(report_file=report_file, headers=["PID", "Status"], wait=0,
+                                 resume=True).process_pids(
+            ["a", "b", "c"], lambda pid, csv_report: processed.append(pid) or write_or_fail(pid, csv_report, None))
+        assert processed == ["b", "c"]
+        assert 'Skipped 1 entries that were already done' in caplog.messages
+        with open(report_file) as f:
+            assert f.read() == "PID,Status\na,OK\nb,OK\nc,OK\n"
+
+    def test_resume_without_journal(self):
+        with pytest.raises(ValueError):
+            BatchProcessorWithReport(report_file='-', resume=True)
+
+    def test_retries_transient_errors(self, tmp_path, caplog):
+        caplog.set_level('INFO')
+        report_file = str(tmp_path / "report.csv")
+        attempts = []
+
+        def fail_first_attempt(pid, csv_report):
+            attempts.append(pid)
+            if pid == "b" and attempts.count(pid) == 1:
+                raise requests.ConnectionError("Connection reset by peer")
+            csv_report.write({"PID": pid, "Status": "OK"})
+
+        batch_processor = BatchProcessorWithReport(report_file=report_file, headers=["PID", "Status"], wait=0,
+                                                   retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01))
+        batch_processor.process_pids(["a", "b", "c"], fail_first_attempt)
+        assert attempts == ["a", "b", "b", "c"]
+        assert caplog.messages[3].startswith(
+            'Attempt 1 of 3 failed on entry nr 2: Connection reset by peer; retrying in ')
+        with open(report_file) as f:
+            assert f.read() == ("PID,Status,Attempt,Error\n"
+                                "a,OK,1,\n"
+                                "b,,1,Connection reset by peer\n"
+                                "b,OK,2,\n"
+                                "c,OK,1,\n")
+
+    def test_does_not_retry_other_errors(self):
+        attempts = []
+
+        def fail(pid):
+            attempts.append(pid)
+            raise ValueError(f"{pid} is invalid")
+
+        BatchProcessor(wait=0, max_attempts=3).process_pids(["a"], fail)
+        assert attempts == ["a"]
+
+    def test_prints_summary(self, capsys):
+        batch_processor = BatchProcessor(wait=0, fail_on_first_error=False)
+        batch_processor.process_pids(["a", "b", "c"], lambda pid: time.sleep(0.05))
+        assert batch_processor.stats.num_processed == 3
+        assert batch_processor.stats.latencies.min >= 0.05
+        assert capsys.readouterr().err.startswith('Processed 3 entries in 0:00:00')
+
+    def test_progress_replaces_logging_of_each_entry(self, caplog):
+        caplog.set_level('INFO')
+        processed = []
+        batch_processor = BatchProcessor(wait=0, fail_on_first_error=False, progress=True)
+        batch_processor.process_pids(["a", "b", "c"], lambda pid: processed.append(pid))
+        assert processed == ["a", "b", "c"]
+        assert not any(message.startswith('Processing ') for message in caplog.messages)
+        assert caplog.messages[-1] == 'Batch processing ended: 3 entries processed'
+        assert batch_processor.batch_progress is None
+
+    def test_stops_after_max_duration(self, caplog):
+        caplog.set_level('INFO')
+        processed = []
+        batch_processor = BatchProcessor(wait=0, max_duration=0.25)
+        batch_processor.process_pids([str(i) for i in range(10)], lambda pid: (processed.append(pid), time.sleep(0.1)))
+        assert 2 <= len(processed) < 10
+        assert caplog.messages[-1] == f'Batch processing stopped early: {len(processed)} entries processed'
+
+    def test_sigint_finishes_entry_in_progress(self, tmp_path, caplog):
+        caplog.set_level('INFO')
+        report_file = str(tmp_path / "report.csv")
+        handler_before = signal.getsignal(signal.SIGINT)
+
+        def interrupt_on_b(pid, csv_report):
+            if pid == "b":
+                os.kill(os.getpid(), signal.SIGINT)
+            csv_report.write({"PID": pid, "Status": "OK"})
+
+        batch_processor = BatchProcessorWithReport(report_file=report_file, headers=["PID", "Status"], wait=0)
+        batch_processor.process_pids(["a", "b", "c"], interrupt_on_b)
+        assert signal.getsignal(signal.SIGINT) is handler_before
+        with open(report_file) as f:
+            assert f.read() == "PID,Status\na,OK\nb,OK\n"
+        assert caplog.messages[-1] == 'Run again with --resume to process the remaining entries'
+
+        resumed = []
+        batch_processor = BatchProcessorWithReport(report_file=report_file, headers=["PID", "Status"], wait=0,
+                                                   resume=True)
+        batch_processor.process_pids(["a", "b", "c"], lambda pid, csv_report: resumed.append(pid))
+        assert resumed == ["c"]
+
+    def test_request_stop_drains_workers(self):
+        started = []
+        batch_processor = BatchProcessor(wait=0, parallel=2)
+
+        def stop_on_c(pid):
+            started.append(pid)
+            if pid == "c":
+                batch_processor.request_stop("test")
+            time.sleep(0.05)
+
+        batch_processor.process_pids([str(c) for c in "abcdefghij"], stop_on_c)
+        assert "c" in started
+        assert len(started) < 10
+        assert batch_processor.stats.num_processed == len(started)
+
+    def test_no_entry_starts_after_stop(self):
+        started = []
+        release = threading.Event()
+        batch_processor = BatchProcessor(wait=0, parallel=2, fail_on_first_error=False)
+
+        def block(pid):
+            started.append(pid)
+            release.wait(5)
+
+        thread = threading.Thread(target=batch_processor.process_pids, args=(list("abcdef"), block))
+        thread.start()
+        time.sleep(0.2)
+        assert sorted(started) == ["a", "b"]
+        batch_processor.request_stop("test")
+        release.set()
+        thread.join(5)
+        assert sorted(started) == ["a", "b"]
+        assert batch_processor.stats.num_processed == 2
+
+    def test_does_not_retry_after_stop(self):
+        attempts = []
+        batch_processor = BatchProcessor(wait=0, retry_policy=RetryPolicy(max_attempts=3, base_delay=10))
+
+        def fail_and_stop(pid):
+            attempts.append(pid)
+            batch_processor.request_stop("test")
+            raise requests.ConnectionError("Connection reset by peer")
+
+        start = time.monotonic()
+        batch_processor.process_pids(["a", "b"], fail_and_stop)
+        assert attempts == ["a"]
+        assert time.monotonic() - start < 5
+
+    def test_failed_out(self, tmp_path, caplog):
+        caplog.set_level('INFO')
+        failed_out = str(tmp_path / "failed.txt")
+
+        def fail_on_odd(pid):
+            if int(pid) % 2 == 1:
+                raise ValueError(f"{pid} is odd")
+
+        BatchProcessor(wait=0, fail_on_first_error=False, failed_out=failed_out).process_pids(
+            [str(i) for i in range(6)], fail_on_odd)
+        assert list(get_pids(failed_out)) == ["1", "3", "5"]
+        assert caplog.messages[-2] == f'Wrote 3 failed entries to {failed_out}'
+
+    def test_entry_timeout_sets_deadline_per_attempt(self):
+        remaining_times = []
+        BatchProcessor(wait=0, entry_timeout=5).process_pids(["a", "b"],
+                                                             lambda pid: remaining_times.append(get_remaining_time()))
+        assert all(4 < remaining <= 5 for remaining in remaining_times)
+        assert get_remaining_time() is None
+
+    def test_report_durations(self, tmp_path):
+        report_file = str(tmp_path / "report.csv")
+        batch_processor = BatchProcessorWithReport(report_file=report_file, headers=["PID", "Status"], wait=0,
+                                                   report_durations=True)
+
+        def sleep_and_write(pid, csv_report):
+            time.sleep(0.1)
+            csv_report.write({"PID": pid, "Status": "OK"})
+
+        batch_processor.process_pids(["a"], sleep_and_write)
+        with open(report_file) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == "PID,Status,Duration"
+        assert lines[1].startswith("a,OK,0.1")
+
     def test_get_single_pid(self):
         pids = get_pids('doi:10.5072/DAR/ATALUT')
         assert pids == ['doi:10.5072/DAR/ATALUT']
@@ -198,12 +459,46 @@ class TestBatchProcessor:
             f.write('doi:10.5072/DAR/ATALUT\ndoi:10.17026/dans-xfg-s8q3\n')
             f.close()
         pids = get_pids(pids_file)
-        assert pids == ['doi:10.5072/DAR/ATALUT', 'doi:10.17026/dans-xfg-s8q3']
+        assert list(pids) == ['doi:10.5072/DAR/ATALUT', 'doi:10.17026/dans-xfg-s8q3']
 
     def test_get_pids_from_empty_file(self, tmp_path):
         pids_file = tmp_path / "empty.txt"
         open(pids_file, 'w').close()
-        assert get_pids(pids_file) == []
+        assert list(get_pids(pids_file)) == []
 
     def test_no_pids_or_file(self):
         assert get_pids(None) == []
+
+    def test_get_pids_skips_blank_lines_comments_and_duplicates(self, tmp_path, caplog):
+        caplog.set_level('INFO')
+        pids_file = tmp_path / "pids.txt"
+        with open(pids_file, 'w') as f:
+            f.write('# datasets to reindex\ndoi:10.5072/A\n\n  doi:10.5072/B  \ndoi:10.5072/A\n')
+        pids = get_pids(pids_file)
+        assert list(pids) == ['doi:10.5072/A', 'doi:10.5072/B']
+        assert pids.count() == 2
+        assert caplog.messages == ['Skipped 1 duplicate entries']
+
+    def test_get_pids_from_gzip_file(self, tmp_path):
+        pids_file = tmp_path / "pids.txt.gz"
+        with gzip.open(pids_file, 'wt') as f:
+            f.write('doi:10.5072/A\ndoi:10.5072/B\n')
+        assert list(get_pids(pids_file)) == ['doi:10.5072/A', 'doi:10.5072/B']
+
+    def test_get_pids_from_stdin(self, monkeypatch):
+        monkeypatch.setattr('sys.stdin', io.StringIO('doi:10.5072/A\ndoi:10.5072/B\n'))
+        pids = get_pids('-')
+        assert pids.count() is None
+        assert list(pids) == ['doi:10.5072/A', 'doi:10.5072/B']
+
+    def test_process_entries_from_file(self, tmp_path, caplog):
+        caplog.set_level('INFO')
+        pids_file = tmp_path / "pids.txt"
+        with open(pids_file, 'w') as f:
+            f.write('a\nb\na\n')
+        BatchProcessor(wait=0).process_entries(get_pids(pids_file), lambda pid: None)
+        assert caplog.messages == ['Start batch processing on 2 entries',
+                                   'Processing 1 of 2 entries: a',
+                                   'Processing 2 of 2 entries: b',
+                                   'Skipped 1 duplicate entries',
+                                   'Batch processing ended: 2 entries processed']
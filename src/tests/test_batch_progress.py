@@ -0,0 +1,52 @@
+import io
+
+from rich.console import Console
+
+from datastation.common.batch_progress import BatchProgress
+
+
+def create_progress():
+    return BatchProgress(console=Console(file=io.StringIO(), width=120), num_slowest=2)
+
+
+class TestBatchProgress:
+
+    def test_counts_succeeded_and_failed(self):
+        progress = create_progress()
+        progress.start_batch(total=3)
+        for i in range(1, 4):
+            progress.entry_started(i, f"doi:10.5072/DAR/{i}")
+        progress.entry_finished(1, succeeded=True)
+        progress.entry_finished(2, succeeded=False)
+        progress.stop()
+        task = progress.tasks[0]
+        assert task.completed == 2
+        assert task.total == 3
+        assert task.fields['succeeded'] == 1
+        assert task.fields['failed'] == 1
+        assert [entry for entry, _ in progress.get_slowest_in_flight()] == ["doi:10.5072/DAR/3"]
+
+    def test_slowest_in_flight_first(self):
+        progress = create_progress()
+        progress.start_batch(total=None)
+        progress.entry_started(1, {'PID': 'doi:10.5072/DAR/1'})
+        progress.entry_started(2, "doi:10.5072/DAR/2")
+        progress.entry_started(3, "doi:10.5072/DAR/3")
+        progress.stop()
+        assert [entry for entry, _ in progress.get_slowest_in_flight()] == ["doi:10.5072/DAR/1", "doi:10.5072/DAR/2"]
+
+    def test_skipped_entries_advance_the_bar(self):
+        progress = create_progress()
+        progress.start_batch(total=2)
+        progress.entry_skipped()
+        progress.stop()
+        assert progress.tasks[0].completed == 1
+        assert progress.tasks[0].fields['succeeded'] == 0
+
+    def test_callback_output_goes_to_stdout(self, capsys):
+        # on a terminal rich would otherwise redirect stdout to the console of the display, which is on stderr
+        progress = BatchProgress(console=Console(file=io.StringIO(), width=120, force_terminal=True))
+        progress.start_batch(total=1)
+        print('{"pid": "doi:10.5072/DAR/1"}')
+        progress.stop()
+        assert '{"pid": "doi:10.5072/DAR/1"}' in capsys.readouterr().out
@@ -0,0 +1,44 @@
+from datastation.common.batch_stats import LatencyHistogram, BatchStats
+
+
+class TestLatencyHistogram:
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        assert histogram.quantile(0.5) is None
+        assert histogram.min is None
+
+    def test_quantiles_within_precision(self):
+        histogram = LatencyHistogram(precision=0.01)
+        for i in range(1, 1001):
+            histogram.record(i / 100)
+        assert histogram.min == 0.01
+        assert histogram.max == 10.0
+        assert abs(histogram.quantile(0.5) - 5.0) <= 0.05
+        assert abs(histogram.quantile(0.95) - 9.5) <= 0.1
+        assert abs(histogram.quantile(0.99) - 9.9) <= 0.1
+        assert histogram.quantile(1.0) == 10.0
+
+    def test_memory_depends_on_range_not_count(self):
+        histogram = LatencyHistogram(precision=0.01)
+        for i in range(100000):
+            histogram.record(0.5 + (i % 100) / 1000)
+        assert histogram.count == 100000
+        assert len(histogram.buckets) < 20
+
+
+class TestBatchStats:
+
+    def test_summary(self):
+        stats = BatchStats()
+        for latency in [0.1, 0.2, 0.3]:
+            stats.record_latency(latency)
+            stats.record_entry(succeeded=True)
+        stats.record_latency(1.0)
+        stats.record_entry(succeeded=False)
+        assert stats.get_error_rate() == 0.25
+        lines = stats.get_summary().split('\n')
+        assert lines[0].startswith('Processed 4 entries in 0:00:00 (')
+        assert lines[0].endswith('entries/s); 1 failed (25.0%)')
+        assert lines[1].startswith('Latency (s): min 0.100, p50 0.20')
+        assert lines[1].endswith('max 1.000')
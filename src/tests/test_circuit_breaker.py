@@ -0,0 +1,125 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from datastation.common.batch_processing import BatchProcessor
+from datastation.common.circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breakers_wait_time
+from datastation.common.http_session import create_session
+from datastation.common.retry import is_retryable
+
+url = 'http://localhost:8080/api/info/version'
+
+
+def fail(circuit_breaker, times):
+    for _ in range(times):
+        circuit_breaker.before_request(url)
+        circuit_breaker.record(url, succeeded=False)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=3, cool_down=0.1)
+        fail(circuit_breaker, 2)
+        circuit_breaker.before_request(url)
+        circuit_breaker.record(url, succeeded=True)
+        fail(circuit_breaker, 2)
+        assert circuit_breaker.state == 'closed'
+        fail(circuit_breaker, 1)
+        assert circuit_breaker.state == 'open'
+        with pytest.raises(CircuitOpenError) as e:
+            circuit_breaker.before_request(url)
+        assert is_retryable(e.value)
+        assert 0 < circuit_breaker.get_wait_time() <= 0.1
+
+    def test_opens_on_error_rate(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=100, error_rate=0.5, window=10, cool_down=0.1)
+        for i in range(10):
+            circuit_breaker.before_request(url)
+            circuit_breaker.record(url, succeeded=i % 2 == 1)
+        assert circuit_breaker.state == 'open'
+
+    def test_half_open_lets_one_probe_through(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, cool_down=0.1)
+        fail(circuit_breaker, 1)
+        time.sleep(0.1)
+        assert circuit_breaker.get_wait_time() == 0
+        circuit_breaker.before_request(url)
+        assert circuit_breaker.state == 'half-open'
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.before_request(url)
+        assert circuit_breaker.get_wait_time() > 0
+        circuit_breaker.record(url, succeeded=True)
+        assert circuit_breaker.state == 'closed'
+        circuit_breaker.before_request(url)
+
+    def test_failed_probe_opens_again(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, cool_down=0.1)
+        fail(circuit_breaker, 1)
+        time.sleep(0.1)
+        fail(circuit_breaker, 1)
+        assert circuit_breaker.state == 'open'
+        assert circuit_breaker.get_wait_time() > 0.05
+
+
+class TestCircuitBreakerInSession:
+
+    def test_server_errors_open_the_circuit_breaker(self):
+        session = create_session({'circuit_breaker': {'failure_threshold': 2, 'cool_down': 0.2}})
+        with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+            mock_send.return_value = requests.Response()
+            mock_send.return_value.status_code = 503
+            session.get(url)
+            session.get(url)
+            with pytest.raises(CircuitOpenError):
+                session.get(url)
+            assert mock_send.call_count == 2
+            assert get_circuit_breakers_wait_time() > 0
+            time.sleep(0.2)
+            mock_send.return_value.status_code = 200
+            assert session.get(url).status_code == 200
+            assert session.circuit_breaker.state == 'closed'
+
+    def test_can_be_disabled(self):
+        assert create_session({'circuit_breaker': False}).circuit_breaker is None
+
+    def test_batch_processor_pauses_while_open(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, cool_down=0.3)
+        started = []
+
+        def fail_first(pid):
+            started.append(time.monotonic())
+            if pid == "a":
+                fail(circuit_breaker, 1)
+
+        BatchProcessor(wait=0, fail_on_first_error=False).process_pids(["a", "b"], fail_first)
+        assert started[1] - started[0] >= 0.25
+
+    def test_parallel_batch_processor_sends_one_probe_after_cool_down(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, cool_down=0.2)
+        fail(circuit_breaker, 1)
+        lock = threading.Lock()
+        refused = []
+        processed = []
+
+        def request(pid):
+            # e.g. reading a file before the first request, so that the state is still open after the cool-down
+            time.sleep(0.05)
+            try:
+                circuit_breaker.before_request(url)
+            except CircuitOpenError:
+                with lock:
+                    refused.append(pid)
+                raise
+            time.sleep(0.05)
+            circuit_breaker.record(url, succeeded=True)
+            with lock:
+                processed.append(pid)
+
+        BatchProcessor(wait=0, parallel=4, fail_on_first_error=True).process_pids([str(i) for i in range(12)], request)
+        assert refused == []
+        assert sorted(processed, key=int) == [str(i) for i in range(12)]
+        assert circuit_breaker.state == 'closed'
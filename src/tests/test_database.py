@@ -0,0 +1,161 @@
+import pytest
+from psycopg.pq import TransactionStatus
+
+from datastation.common import database as database_module
+from datastation.common.database import Database, close_pools
+
+CONFIG = {'host': 'localhost', 'dbname': 'dvndb', 'user': 'dvnuser', 'password': 'secret'}
+
+
+class FakeCursor:
+
+    def __init__(self, connection, name=None, row_factory=None):
+        self.connection = connection
+        self.name = name
+        self.row_factory = row_factory
+        self.itersize = None
+        self.rowcount = 0
+
+    def execute(self, query, *args):
+        self.connection.statements.append((query, *args))
+        self.connection.info.transaction_status = TransactionStatus.INTRANS
+        self.rowcount = 1
+        return self
+
+    def executemany(self, query, params_seq):
+        params_seq = list(params_seq)
+        self.connection.batches.append((query, params_seq))
+        self.connection.info.transaction_status = TransactionStatus.INTRANS
+        self.rowcount = len(params_seq)
+
+    def fetchall(self):
+        return []
+
+    def __iter__(self):
+        self.connection.streamed.append((self.name, self.itersize))
+        return iter([(1,), (2,), (3,)])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class FakeInfo:
+    transaction_status = TransactionStatus.IDLE
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.info = FakeInfo()
+        self.statements = []
+        self.batches = []
+        self.streamed = []
+        self.num_commits = 0
+        self.num_rollbacks = 0
+
+    def cursor(self, name=None, row_factory=None):
+        return FakeCursor(self, name, row_factory)
+
+    def commit(self):
+        self.num_commits += 1
+        self.info.transaction_status = TransactionStatus.IDLE
+
+    def rollback(self):
+        self.num_rollbacks += 1
+        self.info.transaction_status = TransactionStatus.IDLE
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    connections = []
+
+    def connect(conninfo):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(database_module.psycopg, 'connect', connect)
+    yield connections
+    close_pools()
+
+
+class TestDatabase:
+
+    def test_connection_is_reused(self, connections):
+        with Database(CONFIG) as database:
+            database.query('select 1')
+        with Database(CONFIG) as database:
+            database.query('select 2')
+        assert len(connections) == 1
+        # the transaction that the query started is not left open
+        assert connections[0].num_rollbacks == 2
+
+    def test_concurrent_use_opens_more_connections(self, connections):
+        with Database(CONFIG), Database(CONFIG):
+            pass
+        assert len(connections) == 2
+
+    def test_closed_connection_is_discarded(self, connections):
+        with Database(CONFIG):
+            pass
+        connections[0].closed = True
+        with Database(CONFIG) as database:
+            assert database.connection is connections[1]
+
+    def test_update_commits(self, connections):
+        with Database(CONFIG) as database:
+            assert database.update('update x set y = %s', (1,)) == 1
+        assert connections[0].num_commits == 1
+
+    def test_transaction_commits_once(self, connections):
+        with Database(CONFIG) as database:
+            with database.transaction():
+                database.update('update x set y = %s', (1,))
+                database.update('update x set y = %s', (2,))
+        assert connections[0].num_commits == 1
+
+    def test_transaction_rolls_back_on_error(self, connections):
+        with Database(CONFIG) as database:
+            with pytest.raises(ValueError):
+                with database.transaction():
+                    database.update('update x set y = %s', (1,))
+                    raise ValueError()
+            assert not database.in_transaction
+        assert connections[0].num_commits == 0
+        assert connections[0].num_rollbacks == 1
+
+    def test_update_many_in_batches(self, connections):
+        with Database(CONFIG) as database:
+            assert database.update_many('update x set y = %s', ((i,) for i in range(5)), batch_size=2) == 5
+        assert [len(params_seq) for _, params_seq in connections[0].batches] == [2, 2, 1]
+        assert connections[0].num_commits == 3
+
+    def test_update_many_in_transaction(self, connections):
+        with Database(CONFIG) as database:
+            with database.transaction():
+                database.update_many('update x set y = %s', [(i,) for i in range(5)], batch_size=2)
+        assert connections[0].num_commits == 1
+
+    def test_pool_size_limits_connections(self, connections):
+        config = dict(CONFIG, pool_size=1)
+        with Database(config):
+            pool = database_module.get_pool('host=localhost dbname=dvndb user=dvnuser password=secret')
+            assert not pool.semaphore.acquire(blocking=False)
+        assert pool.semaphore.acquire(blocking=False)
+        pool.semaphore.release()
+
+    def test_stream_uses_server_side_cursor(self, connections):
+        with Database(dict(CONFIG, itersize=100)) as database:
+            rows = database.stream('select id from dvobject')
+            assert connections[0].statements == []
+            assert list(rows) == [(1,), (2,), (3,)]
+            list(database.stream('select id from dvobject', itersize=10))
+        [(first_name, first_itersize), (second_name, second_itersize)] = connections[0].streamed
+        assert first_name is not None and first_name != second_name
+        assert (first_itersize, second_itersize) == (100, 10)
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+from datastation.dataverse.dataset_index import DatasetIndex, get_collection_paths, read_datasets
+
+
+class FakeDatabase:
+    """ Returns canned rows for the queries of read_datasets, and keeps track of the arguments. """
+
+    def __init__(self):
+        self.args = []
+
+    def stream(self, query, *args):
+        return iter(self.query(query, *args))
+
+    def query(self, query, *args):
+        self.args.append(args)
+        if 'from roleassignment' in query:
+            return [(11, 'doi:10.5072/DAR/A', '@user1', 'curator'), (11, 'doi:10.5072/DAR/A', '@user2', 'contributor'),
+                    (12, 'doi:10.5072/DAR/B', '@user1', 'curator')]
+        elif 'inner join dataverse' in query:
+            return [(1, None, 'root'), (2, 1, 'dans'), (3, 2, 'ssh')]
+        else:
+            return [(11, 'doi:10.5072/DAR/A', 3, 'RELEASED', 2, 1500, datetime(2023, 5, 1, 12, 0),
+                     datetime(2024, 3, 1, 9, 0)),
+                    (12, 'doi:10.5072/DAR/B', 1, 'DRAFT', 0, 0, datetime(2024, 1, 2, 8, 30), None)]
+
+
+def make_record(pid, version_state='RELEASED', total_size=0, role_assignees=()):
+    return {'pid': pid, 'collection_path': 'root', 'version_state': version_state, 'file_count': 0,
+            'total_size': total_size, 'modification_time': '2024-01-01T00:00:00', 'role_assignees': role_assignees}
+
+
+class TestReadDatasets:
+
+    def test_collection_paths(self):
+        assert get_collection_paths([(3, 2, 'ssh'), (1, None, 'root'), (2, 1, 'dans')]) == {
+            1: 'root', 2: 'root/dans', 3: 'root/dans/ssh'}
+
+    def test_records(self):
+        records = list(read_datasets(FakeDatabase()))
+        assert records[0] == {'pid': 'doi:10.5072/DAR/A', 'collection_path': 'root/dans/ssh',
+                              'version_state': 'RELEASED', 'file_count': 2, 'total_size': 1500,
+                              'modification_time': '2023-05-01T12:00:00',
+                              'role_assignees': [('@user1', 'curator'), ('@user2', 'contributor')],
+                              'permission_modification_time': '2024-03-01T09:00:00'}
+        assert records[1]['collection_path'] == 'root'
+
+    def test_modified_since(self):
+        database = FakeDatabase()
+        list(read_datasets(database, modified_since='2023-05-01T12:00:00', margin=timedelta(minutes=10)))
+        assert database.args[1] == ([datetime(2023, 5, 1, 11, 50), datetime(2023, 5, 1, 11, 50)],)
+
+    def test_pids_are_passed_as_parameter(self):
+        database = FakeDatabase()
+        list(read_datasets(database, ['doi:10.5072/DAR/A']))
+        assert database.args == [(), ([['doi:10.5072/DAR/A']],), ([['doi:10.5072/DAR/A']],)]
+
+
+class TestDatasetIndex:
+
+    def test_build_and_query(self, tmp_path):
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            assert index.replace_all(read_datasets(FakeDatabase())) == 2
+            assert list(index.query()) == ['doi:10.5072/DAR/A', 'doi:10.5072/DAR/B']
+            assert list(index.query("version_state = 'DRAFT'")) == ['doi:10.5072/DAR/B']
+            assert list(index.query('total_size > ?', (1000,))) == ['doi:10.5072/DAR/A']
+            assert list(index.query(role_assignment='@user1=curator')) == ['doi:10.5072/DAR/A', 'doi:10.5072/DAR/B']
+            assert list(index.query("collection_path like 'root/dans%'",
+                                    role_assignment='@user2=contributor')) == ['doi:10.5072/DAR/A']
+
+    def test_replace_all_removes_old_datasets(self, tmp_path):
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            index.replace_all([make_record('doi:10.5072/DAR/OLD', role_assignees=[('@user1', 'curator')])])
+            index.replace_all(read_datasets(FakeDatabase()))
+            assert index.count() == 2
+            assert 'doi:10.5072/DAR/OLD' not in list(index.query(role_assignment='@user1=curator'))
+
+    def test_update_and_delete(self, tmp_path):
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            index.replace_all([make_record('doi:10.5072/DAR/A', role_assignees=[('@user1', 'curator')]),
+                               make_record('doi:10.5072/DAR/B')])
+            index.update([make_record('doi:10.5072/DAR/A', version_state='DRAFT')])
+            assert list(index.query("version_state = 'DRAFT'")) == ['doi:10.5072/DAR/A']
+            assert list(index.query(role_assignment='@user1=curator')) == []
+            assert index.delete(['doi:10.5072/DAR/B', 'doi:10.5072/DAR/C']) == 1
+            assert list(index.query()) == ['doi:10.5072/DAR/A']
+
+    def test_persists(self, tmp_path):
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            index.replace_all([make_record('doi:10.5072/DAR/A')])
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            assert list(index.query()) == ['doi:10.5072/DAR/A']
+
+    def test_high_water_mark(self, tmp_path):
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            assert index.get_high_water_mark() is None
+            index.replace_all(read_datasets(FakeDatabase()))
+            # a role assignment on dataset A changed after the contents of dataset B
+            assert index.get_high_water_mark() == '2024-03-01T09:00:00'
+            # an update with older datasets does not move it back
+            index.update([make_record('doi:10.5072/DAR/C')])
+            assert index.get_high_water_mark() == '2024-03-01T09:00:00'
+            index.replace_all([make_record('doi:10.5072/DAR/C')])
+            assert index.get_high_water_mark() == '2024-01-01T00:00:00'
+
+    def test_update_of_given_datasets_keeps_high_water_mark(self, tmp_path):
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            index.replace_all([make_record('doi:10.5072/DAR/A')])
+            record = make_record('doi:10.5072/DAR/B')
+            record['modification_time'] = '2024-01-05T00:00:00'
+            index.update([record], advance_mark=False)
+            assert index.get_high_water_mark() == '2024-01-01T00:00:00'
+            assert list(index.query()) == ['doi:10.5072/DAR/A', 'doi:10.5072/DAR/B']
+            index.update([record])
+            assert index.get_high_water_mark() == '2024-01-05T00:00:00'
+
+    def test_reconcile(self, tmp_path):
+        with DatasetIndex(str(tmp_path / 'index.sqlite')) as index:
+            index.replace_all([make_record('doi:10.5072/DAR/A'), make_record('doi:10.5072/DAR/B'),
+                               make_record('doi:10.5072/DAR/C')])
+            assert index.reconcile(['doi:10.5072/DAR/A', 'doi:10.5072/DAR/C', 'doi:10.5072/DAR/D']) == 1
+            assert list(index.query()) == ['doi:10.5072/DAR/A', 'doi:10.5072/DAR/C']
@@ -128,3 +128,65 @@ class TestDatasets:
         assert caplog.records[0].levelname == 'DEBUG'
         assert caplog.records[0].message == ("{'PID': 'doi:10.5072/FK2/8KQW3Y', 'title': 'xxx', 'dansRightsHolder[0]': "
                                              "'me', 'rest.column': 'you'}")
+
+
+class FakeDatabase:
+    """ Answers the queries for dataset attributes for the datasets among the PIDs in the last parameter. """
+
+    def __init__(self, sizes, role_assignments=()):
+        self.sizes = sizes
+        self.role_assignments = role_assignments
+        self.queries = []
+
+    def stream(self, query, args=()):
+        self.queries.append((query, args))
+        pids = args[-1] if 'any(%s)' in query else self.sizes.keys()
+        if 'from roleassignment' in query:
+            return iter([(0, pid, assignee, role) for pid, assignee, role in self.role_assignments
+                         if pid in pids and role == args[0]])
+        elif 'sum(df.filesize)' in query:
+            return iter([(0, pid, 1, 'RELEASED', 1, self.sizes[pid], None, None) for pid in pids if pid in self.sizes])
+        else:
+            return iter([(pid,) for pid in pids if pid in self.sizes])
+
+
+class TestGetDatasetAttributesFromDatabase:
+    cfg = {'server_url': 'https://demo.archaeology.datastations.nl', 'api_token': 'xxx', 'safety_latch': 'ON', 'db': {}}
+
+    def test_storage_in_chunks(self, caplog):
+        database = FakeDatabase({'doi:10.5072/A': 10, 'doi:10.5072/B': 0, 'doi:10.5072/C': 30})
+        datasets = Datasets(DataverseClient(config=self.cfg))
+        pids = ['doi:10.5072/C', 'doi:10.5072/X', 'doi:10.5072/A', 'doi:10.5072/B']
+        attributes = list(datasets.get_dataset_attributes_from_database(database, pids, storage=True, chunk_size=3))
+        assert attributes == [{'pid': 'doi:10.5072/C', 'storage': 30},
+                              {'pid': 'doi:10.5072/A', 'storage': 10},
+                              {'pid': 'doi:10.5072/B', 'storage': 0}]
+        assert len(database.queries) == 2
+        assert caplog.records[0].message == 'Dataset doi:10.5072/X not found in the database'
+
+    def test_storage_of_all_datasets(self):
+        database = FakeDatabase({'doi:10.5072/A': 10, 'doi:10.5072/B': 0})
+        datasets = Datasets(DataverseClient(config=self.cfg))
+        attributes = list(datasets.get_dataset_attributes_from_database(database, storage=True))
+        assert attributes == [{'pid': 'doi:10.5072/A', 'storage': 10}, {'pid': 'doi:10.5072/B', 'storage': 0}]
+        assert len(database.queries) == 1
+
+    def test_users_with_role(self):
+        database = FakeDatabase({'doi:10.5072/A': 10, 'doi:10.5072/B': 0},
+                                [('doi:10.5072/A', '@user1', 'curator'), ('doi:10.5072/A', '@user2', 'curator'),
+                                 ('doi:10.5072/B', '@user1', 'contributor')])
+        datasets = Datasets(DataverseClient(config=self.cfg))
+        pids = ['doi:10.5072/B', 'doi:10.5072/A']
+        attributes = list(datasets.get_dataset_attributes_from_database(database, pids, user_with_role='curator'))
+        assert attributes == [{'pid': 'doi:10.5072/B', 'users': []},
+                              {'pid': 'doi:10.5072/A', 'users': ['user1', 'user2']}]
+        assert len(database.queries) == 2
+
+    def test_storage_and_users_of_all_datasets(self):
+        database = FakeDatabase({'doi:10.5072/A': 10, 'doi:10.5072/B': 0}, [('doi:10.5072/B', '@user1', 'curator')])
+        datasets = Datasets(DataverseClient(config=self.cfg))
+        attributes = list(datasets.get_dataset_attributes_from_database(database, storage=True,
+                                                                        user_with_role='curator'))
+        assert attributes == [{'pid': 'doi:10.5072/A', 'storage': 10, 'users': []},
+                              {'pid': 'doi:10.5072/B', 'storage': 0, 'users': ['user1']}]
+        assert len(database.queries) == 2
@@ -0,0 +1,58 @@
+import csv
+import os
+
+from datastation.common.entries import DigestSet, FailedEntriesFile, EntryStream
+
+
+class TestDigestSet:
+
+    def test_add(self):
+        digests = DigestSet()
+        assert digests.add('doi:10.5072/A')
+        assert not digests.add('doi:10.5072/A')
+        assert digests.add('doi:10.5072/B')
+        assert len(digests) == 2
+        assert 'doi:10.5072/A' in digests
+        assert 'doi:10.5072/C' not in digests
+
+    def test_grows_beyond_initial_capacity(self):
+        digests = DigestSet(capacity=8)
+        for i in range(1000):
+            assert digests.add(f'doi:10.5072/{i}')
+        assert len(digests) == 1000
+        assert len(digests.slots) == 2048
+        assert all(f'doi:10.5072/{i}' in digests for i in range(1000))
+
+
+class TestFailedEntriesFile:
+
+    def test_strings_can_be_read_back(self, tmp_path):
+        filename = str(tmp_path / "failed.txt")
+        with FailedEntriesFile(filename) as failed_entries:
+            failed_entries.add('doi:10.5072/A')
+            failed_entries.add('doi:10.5072/B')
+            # written right away, not only when the file is closed
+            with open(f"{filename}.part") as f:
+                assert f.read() == 'doi:10.5072/A\ndoi:10.5072/B\n'
+        assert failed_entries.num_entries == 2
+        assert list(EntryStream(filename)) == ['doi:10.5072/A', 'doi:10.5072/B']
+
+    def test_may_be_the_input(self, tmp_path):
+        filename = str(tmp_path / "failed.txt")
+        with open(filename, 'w') as f:
+            f.write('doi:10.5072/A\ndoi:10.5072/B\n')
+        with FailedEntriesFile(filename) as failed_entries:
+            for entry in EntryStream(filename):
+                if entry.endswith('B'):
+                    failed_entries.add(entry)
+        assert list(EntryStream(filename)) == ['doi:10.5072/B']
+        assert not os.path.exists(f"{filename}.part")
+
+    def test_dictionaries_as_csv(self, tmp_path):
+        filename = str(tmp_path / "failed.csv")
+        with FailedEntriesFile(filename) as failed_entries:
+            failed_entries.add({'PID': 'doi:10.5072/A', 'title': 'A, the first'})
+            failed_entries.add({'PID': 'doi:10.5072/B', 'title': 'B'})
+        with open(filename, newline='') as f:
+            assert list(csv.DictReader(f)) == [{'PID': 'doi:10.5072/A', 'title': 'A, the first'},
+                                               {'PID': 'doi:10.5072/B', 'title': 'B'}]
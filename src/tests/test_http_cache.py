@@ -0,0 +1,96 @@
+import time
+
+import requests
+
+from datastation.common.http_cache import HttpCache
+
+
+class FakeSession:
+    """ Returns the next of the given responses for each GET request, and records the headers that were sent. """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, headers=None, params=None):
+        self.sent_headers.append(headers)
+        status_code, body, response_headers = self.responses.pop(0)
+        r = requests.Response()
+        r.status_code = status_code
+        r.url = url
+        r.headers.update(response_headers)
+        r._content = body
+        return r
+
+
+def create_cache(tmp_path, **kwargs):
+    return HttpCache(str(tmp_path / "cache.sqlite"), **kwargs)
+
+
+class TestHttpCache:
+    url = 'http://localhost:8080/api/datasets/:persistentId/versions/:latest'
+    headers = {'X-Dataverse-key': 'xxx'}
+
+    def test_hit_within_ttl(self, tmp_path):
+        session = FakeSession((200, b'{"data": 1}', {'Content-Type': 'application/json'}))
+        cache = create_cache(tmp_path)
+        assert cache.get(session, self.url, self.headers, {'persistentId': 'doi:A'}).json() == {'data': 1}
+        r = cache.get(session, self.url, self.headers, {'persistentId': 'doi:A'})
+        assert r.json() == {'data': 1}
+        assert r.headers['Content-Type'] == 'application/json'
+        assert cache.get_summary() == 'HTTP cache: 1 hits, 0 revalidated, 1 misses, 0 evicted'
+
+    def test_persists_between_runs(self, tmp_path):
+        create_cache(tmp_path).get(FakeSession((200, b'{}', {})), self.url, self.headers)
+        cache = create_cache(tmp_path)
+        cache.get(FakeSession(), self.url, self.headers)
+        assert cache.num_hits == 1
+
+    def test_cached_per_api_token_and_params(self, tmp_path):
+        session = FakeSession((200, b'1', {}), (200, b'2', {}), (200, b'3', {}))
+        cache = create_cache(tmp_path)
+        cache.get(session, self.url, self.headers, {'persistentId': 'doi:A'})
+        assert cache.get(session, self.url, {'X-Dataverse-key': 'yyy'}, {'persistentId': 'doi:A'}).content == b'2'
+        assert cache.get(session, self.url, self.headers, {'persistentId': 'doi:B'}).content == b'3'
+        assert cache.num_misses == 3
+
+    def test_errors_are_not_cached(self, tmp_path):
+        session = FakeSession((503, b'', {}), (200, b'{}', {}))
+        cache = create_cache(tmp_path)
+        assert cache.get(session, self.url, self.headers).status_code == 503
+        assert cache.get(session, self.url, self.headers).status_code == 200
+
+    def test_revalidates_with_etag_after_ttl(self, tmp_path):
+        session = FakeSession((200, b'{"v": 1}', {'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}),
+                              (304, b'', {}))
+        cache = create_cache(tmp_path, ttl=0.1)
+        cache.get(session, self.url, self.headers)
+        time.sleep(0.15)
+        assert cache.get(session, self.url, self.headers).json() == {'v': 1}
+        assert session.sent_headers[1] == {'X-Dataverse-key': 'xxx', 'If-None-Match': '"v1"',
+                                           'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+        assert cache.num_revalidated == 1
+        # the revalidated response is fresh again
+        assert cache.get(session, self.url, self.headers).json() == {'v': 1}
+        assert cache.num_hits == 1
+
+    def test_refetches_without_validators_after_ttl(self, tmp_path):
+        session = FakeSession((200, b'1', {}), (200, b'2', {}))
+        cache = create_cache(tmp_path, ttl=0.1)
+        cache.get(session, self.url, self.headers)
+        time.sleep(0.15)
+        assert cache.get(session, self.url, self.headers).content == b'2'
+        assert 'If-None-Match' not in session.sent_headers[1]
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        body = b'x' * 400 * 1024
+        session = FakeSession((200, body, {}), (200, body, {}), (200, body, {}))
+        cache = create_cache(tmp_path, max_size_mb=1)
+        cache.get(session, f"{self.url}/a", self.headers)
+        cache.get(session, f"{self.url}/b", self.headers)
+        cache.get(session, f"{self.url}/a", self.headers)
+        cache.get(session, f"{self.url}/c", self.headers)
+        assert cache.num_evicted == 1
+        cache.get(session, f"{self.url}/a", self.headers)
+        cache.get(session, f"{self.url}/c", self.headers)
+        assert cache.num_hits == 3
@@ -0,0 +1,141 @@
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from datastation.common.http_session import create_session, MemoizingSession, deadline, get_remaining_time, \
+    DeadlineExceeded
+from datastation.common.retry import is_retryable
+from datastation.dans_bag.validate_dans_bag import ValidateDansBag
+from datastation.dataverse.dataverse_client import DataverseClient
+
+
+class TestCreateSession:
+
+    def test_defaults(self):
+        session = create_session()
+        adapter = session.get_adapter('https://demo.dataverse.nl')
+        assert adapter._pool_maxsize == 10
+        assert session.headers['Connection'] == 'keep-alive'
+
+    def test_pool_size_and_keep_alive(self):
+        session = create_session({'pool_size': 32, 'keep_alive': False})
+        assert session.get_adapter('http://localhost:8080')._pool_maxsize == 32
+        assert session.get_adapter('https://demo.dataverse.nl')._pool_maxsize == 32
+        assert session.headers['Connection'] == 'close'
+
+
+def send_and_get_timeout(session, **kwargs):
+    with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+        mock_send.return_value = requests.Response()
+        mock_send.return_value.status_code = 200
+        session.get('http://localhost:8080/api/info/version', **kwargs)
+        return mock_send.call_args[1]['timeout']
+
+
+class TestTimeouts:
+
+    def test_default_timeouts(self):
+        assert send_and_get_timeout(create_session()) == (10, 300)
+
+    def test_configured_timeouts(self):
+        assert send_and_get_timeout(create_session({'connect_timeout': 2, 'read_timeout': 30})) == (2, 30)
+
+    def test_service_default_read_timeout(self):
+        assert send_and_get_timeout(create_session(read_timeout=None)) == (10, None)
+        assert send_and_get_timeout(create_session({'read_timeout': 60}, read_timeout=None)) == (10, 60)
+
+    def test_validate_dans_bag_has_no_read_timeout(self):
+        validator = ValidateDansBag({'service_baseurl': 'http://localhost:20330'})
+        assert validator.session.read_timeout is None
+
+    def test_explicit_timeout(self):
+        assert send_and_get_timeout(create_session(), timeout=5) == (5, 5)
+
+    def test_deadline_cuts_timeouts(self):
+        with deadline(1):
+            connect_timeout, read_timeout = send_and_get_timeout(create_session({'read_timeout': None}))
+        assert 0.9 < connect_timeout <= 1
+        assert 0.9 < read_timeout <= 1
+        assert get_remaining_time() is None
+
+    def test_inner_deadline_cannot_extend_outer(self):
+        with deadline(1):
+            with deadline(60):
+                assert get_remaining_time() <= 1
+            assert get_remaining_time() <= 1
+
+    def test_no_request_after_deadline(self):
+        with deadline(0.01):
+            time.sleep(0.02)
+            with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+                with pytest.raises(DeadlineExceeded) as e:
+                    create_session().get('http://localhost:8080/api/info/version')
+                mock_send.assert_not_called()
+        assert is_retryable(e.value)
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, params=None):
+        self.requests.append((method, url, params))
+        r = requests.Response()
+        r.status_code = 200
+        r._content = f'{{"data": {len(self.requests)}}}'.encode('utf-8')
+        return r
+
+    def get(self, url, headers=None, params=None):
+        return self.request('GET', url, params)
+
+    def post(self, url, headers=None, params=None, json=None):
+        return self.request('POST', url, params)
+
+
+class TestMemoizingSession:
+    url = 'http://localhost:8080/api/datasets/:persistentId/assignments'
+
+    def test_identical_gets_are_sent_once(self):
+        session = FakeSession()
+        memoizing_session = MemoizingSession(session)
+        assert memoizing_session.get_memoized(self.url, params={'persistentId': 'doi:A'}).json() == {'data': 1}
+        assert memoizing_session.get_memoized(self.url, params={'persistentId': 'doi:A'}).json() == {'data': 1}
+        assert memoizing_session.get_memoized(self.url, params={'persistentId': 'doi:B'}).json() == {'data': 2}
+        # a plain get is not memoized
+        memoizing_session.get(self.url, params={'persistentId': 'doi:A'})
+        assert len(session.requests) == 3
+
+    def test_forgets_after_mutation(self):
+        session = FakeSession()
+        memoizing_session = MemoizingSession(session)
+        memoizing_session.get_memoized(self.url, params={'persistentId': 'doi:A'})
+        memoizing_session.post(self.url, params={'persistentId': 'doi:A'}, json={'assignee': '@user'})
+        assert memoizing_session.get_memoized(self.url, params={'persistentId': 'doi:A'}).json() == {'data': 3}
+        assert [method for method, _, _ in session.requests] == ['GET', 'POST', 'GET']
+
+
+class TestDataverseClient:
+    cfg = {'server_url': 'http://localhost:8080', 'api_token': 'xxx', 'safety_latch': 'ON', 'db': {},
+           'http': {'pool_size': 4}}
+
+    def test_api_objects_share_the_session(self):
+        client = DataverseClient(config=self.cfg)
+        assert client.session.get_adapter(client.server_url)._pool_maxsize == 4
+        for api in [client.banner(), client.search_api(), client.file(1), client.built_in_users('key'),
+                    client.metrics()]:
+            assert api.session is client.session
+        # wrapped to memoize GET requests
+        assert client.dataset('doi:10.5072/FK2/ABC').session.session is client.session
+        assert client.dataverse().session.session is client.session
+
+    def test_cache_only_when_requested_and_configured(self, tmp_path):
+        cfg = dict(self.cfg, cache={'file': str(tmp_path / 'cache.sqlite'), 'ttl': 60})
+        assert DataverseClient(config=cfg).cache is None
+        assert DataverseClient(config=self.cfg, use_cache=True).cache is None
+        client = DataverseClient(config=cfg, use_cache=True)
+        assert client.cache.ttl == 60
+        assert client.dataset('doi:10.5072/FK2/ABC').session.cache is client.cache
+        assert client.dataverse('root').session.cache is client.cache
@@ -0,0 +1,43 @@
+from datastation.common.journal import Journal, get_entry_key
+
+
+class TestGetEntryKey:
+
+    def test_string(self):
+        assert get_entry_key('doi:10.5072/FK2/ABC') == 'doi:10.5072/FK2/ABC'
+
+    def test_dict_with_pid(self):
+        assert get_entry_key({'PID': 'doi:10.5072/FK2/ABC', 'title': 'x'}) == 'doi:10.5072/FK2/ABC'
+
+    def test_dict_without_pid(self):
+        assert get_entry_key({'b': 2, 'a': 1}) == '{"a": 1, "b": 2}'
+
+
+class TestJournal:
+
+    def test_records_outcomes(self, tmp_path):
+        with Journal(tmp_path / 'run.journal') as journal:
+            journal.record('a')
+            journal.record('b', 'FAILED: b is not allowed')
+            assert journal.is_done('a')
+            assert not journal.is_done('b')
+            assert not journal.is_done('c')
+            assert journal.count_done() == 1
+
+    def test_resume_keeps_entries(self, tmp_path):
+        with Journal(tmp_path / 'run.journal') as journal:
+            journal.record('a')
+        with Journal(tmp_path / 'run.journal', resume=True) as journal:
+            assert journal.is_done('a')
+
+    def test_new_run_clears_entries(self, tmp_path):
+        with Journal(tmp_path / 'run.journal') as journal:
+            journal.record('a')
+        with Journal(tmp_path / 'run.journal') as journal:
+            assert not journal.is_done('a')
+
+    def test_later_outcome_replaces_earlier(self, tmp_path):
+        with Journal(tmp_path / 'run.journal') as journal:
+            journal.record('a', 'FAILED: try again')
+            journal.record('a')
+            assert journal.is_done('a')
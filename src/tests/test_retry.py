@@ -0,0 +1,58 @@
+import requests
+
+from datastation.common.retry import RetryPolicy, is_retryable
+
+
+def http_error(status_code, text=''):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode('utf-8')
+    return requests.HTTPError(response=response)
+
+
+class TestIsRetryable:
+
+    def test_connection_errors_and_timeouts(self):
+        assert is_retryable(requests.ConnectionError())
+        assert is_retryable(requests.ReadTimeout())
+
+    def test_server_errors(self):
+        assert is_retryable(http_error(500))
+        assert is_retryable(http_error(502))
+        assert is_retryable(http_error(503))
+
+    def test_lock_conflicts(self):
+        assert is_retryable(http_error(409))
+        assert is_retryable(http_error(403, '{"status":"ERROR","message":"Dataset is locked"}'))
+        assert is_retryable(RuntimeError('Locks not removed after 10 tries.'))
+
+    def test_client_errors(self):
+        assert not is_retryable(http_error(400))
+        assert not is_retryable(http_error(403, '{"status":"ERROR","message":"Not authorized"}'))
+        assert not is_retryable(http_error(404))
+
+    def test_other_exceptions(self):
+        assert not is_retryable(ValueError('invalid'))
+        assert not is_retryable(RuntimeError('something else'))
+
+
+class TestRetryPolicy:
+
+    def test_no_retries_by_default(self):
+        assert not RetryPolicy().should_retry(http_error(502), 1)
+
+    def test_retries_up_to_max_attempts(self):
+        policy = RetryPolicy(max_attempts=3)
+        assert policy.should_retry(http_error(502), 1)
+        assert policy.should_retry(http_error(502), 2)
+        assert not policy.should_retry(http_error(502), 3)
+
+    def test_does_not_retry_client_errors(self):
+        assert not RetryPolicy(max_attempts=3).should_retry(http_error(404), 1)
+
+    def test_delay_grows_exponentially_up_to_max_delay(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=5.0)
+        for _ in range(100):
+            assert 0 <= policy.get_delay(1) <= 1.0
+            assert 0 <= policy.get_delay(3) <= 4.0
+            assert 0 <= policy.get_delay(8) <= 5.0
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from datastation.dataverse.search_api import SearchApi, get_year_partitions
+
+
+class FakeSearchSession:
+    """ Serves pages of search results for the given number of datasets, and keeps track of the requests. """
+
+    def __init__(self, num_datasets, delay=0.0):
+        self.num_datasets = num_datasets
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.requested_starts = []
+        self.num_concurrent = 0
+        self.max_concurrent = 0
+
+    def get(self, url, headers=None, params=None):
+        with self.lock:
+            self.requested_starts.append(int(params['start']))
+            self.num_concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.num_concurrent)
+        time.sleep(self.delay)
+        start = int(params['start'])
+        end = min(start + int(params['per_page']), self.num_datasets)
+        items = [{'global_id': f'doi:10.5072/DAR/{i}', 'name': f'Dataset {i}'} for i in range(start, end)]
+        r = requests.Response()
+        r.status_code = 200
+        r.json = lambda: {'data': {'total_count': self.num_datasets, 'items': items}}
+        with self.lock:
+            self.num_concurrent -= 1
+        return r
+
+
+class TestSearch:
+
+    def test_yields_all_items_in_order(self):
+        session = FakeSearchSession(num_datasets=110, delay=0.02)
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        pids = [item['global_id'] for item in search_api.search()]
+        assert pids == [f'doi:10.5072/DAR/{i}' for i in range(110)]
+        assert sorted(session.requested_starts) == [0, 25, 50, 75, 100]
+        assert session.max_concurrent > 1
+
+    def test_bounded_lookahead(self):
+        session = FakeSearchSession(num_datasets=1000)
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        results = search_api.search(prefetch=2)
+        next(results)
+        time.sleep(0.05)
+        assert len(session.requested_starts) == 1
+        for _ in range(25):
+            next(results)
+        time.sleep(0.05)
+        assert len(session.requested_starts) <= 4
+        results.close()
+
+    def test_full_last_page(self):
+        session = FakeSearchSession(num_datasets=50)
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        assert len(list(search_api.search())) == 50
+        assert sorted(session.requested_starts) == [0, 25, 50]
+
+    def test_single_page(self):
+        session = FakeSearchSession(num_datasets=100)
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        pids = [item['global_id'] for item in search_api.search(rows=10, start=20)]
+        assert pids == [f'doi:10.5072/DAR/{i}' for i in range(20, 30)]
+        assert session.requested_starts == [20]
+
+    def test_fields_and_per_page(self):
+        session = FakeSearchSession(num_datasets=2500)
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        items = list(search_api.search(per_page=1000, fields=['global_id']))
+        assert len(items) == 2500
+        assert items[0] == {'global_id': 'doi:10.5072/DAR/0'}
+        assert sorted(session.requested_starts) == [0, 1000, 2000]
+
+    def test_per_page_at_most_1000(self):
+        search_api = SearchApi('http://localhost:8080', 'xxx', FakeSearchSession(num_datasets=0))
+        with pytest.raises(ValueError):
+            next(search_api.search(per_page=1001))
+
+
+class FakePartitionedSearchSession:
+    """ Serves pages of search results per filter query, and keeps track of the requests. """
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def get(self, url, headers=None, params=None):
+        with self.lock:
+            self.requests.append(params)
+        items = self.partitions[params['fq']]
+        start = int(params['start'])
+        page = [dict(item) for item in items[start:start + int(params['per_page'])]]
+        r = requests.Response()
+        r.status_code = 200
+        r.json = lambda: {'data': {'total_count': len(items), 'items': page}}
+        return r
+
+
+def make_items(start, end):
+    return [{'global_id': f'doi:10.5072/DAR/{i}', 'name': f'Dataset {i}'} for i in range(start, end)]
+
+
+class TestSearchPartitioned:
+
+    def test_yields_each_item_once(self):
+        session = FakePartitionedSearchSession({
+            'year:2020': make_items(0, 30),
+            # item 29 was modified and moved to the next partition while it was being enumerated
+            'year:2021': make_items(29, 70),
+            'year:2022': [],
+        })
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        items = list(search_api.search_partitioned(['year:2020', 'year:2021', 'year:2022'], per_page=10))
+        assert sorted(item['global_id'] for item in items) == sorted(f'doi:10.5072/DAR/{i}' for i in range(70))
+        assert {(params['sort'], params['order']) for params in session.requests} == {('date', 'asc')}
+
+    def test_fields_without_global_id(self):
+        session = FakePartitionedSearchSession({'a': make_items(0, 5), 'b': make_items(3, 8)})
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        items = list(search_api.search_partitioned(['a', 'b'], fields=['name']))
+        assert sorted(item['name'] for item in items) == sorted(f'Dataset {i}' for i in range(8))
+        assert all(list(item.keys()) == ['name'] for item in items)
+
+    def test_failing_partition_raises(self):
+        session = FakePartitionedSearchSession({'a': make_items(0, 5)})
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        with pytest.raises(KeyError):
+            list(search_api.search_partitioned(['a', 'missing']))
+
+    def test_dry_run(self, capsys):
+        session = FakePartitionedSearchSession({'year:2020': make_items(0, 5), 'year:2021': make_items(5, 10)})
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        assert list(search_api.search_partitioned(['year:2020', 'year:2021'], dry_run=True)) == []
+        assert session.requests == []
+        out = capsys.readouterr().out
+        assert out.count('DRY-RUN') == 2
+        assert "'fq': 'year:2020'" in out and "'fq': 'year:2021'" in out
+
+    def test_stops_reading_when_closed(self):
+        session = FakePartitionedSearchSession({'year:2020': make_items(0, 1000), 'year:2021': make_items(1000, 2000)})
+        search_api = SearchApi('http://localhost:8080', 'xxx', session)
+        results = search_api.search_partitioned(['year:2020', 'year:2021'], per_page=10, parallel=2)
+        next(results)
+        results.close()
+        assert len(session.requests) < 20
+
+
+class TestGetYearPartitions:
+
+    def test_covers_all_dates(self):
+        assert get_year_partitions(2020, 2021) == [
+            'dateSort:[* TO 2020-01-01T00:00:00Z}',
+            'dateSort:[2020-01-01T00:00:00Z TO 2021-01-01T00:00:00Z}',
+            'dateSort:[2021-01-01T00:00:00Z TO 2022-01-01T00:00:00Z}',
+            'dateSort:[2022-01-01T00:00:00Z TO *]',
+            '-dateSort:[* TO *]',
+        ]
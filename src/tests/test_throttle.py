@@ -0,0 +1,124 @@
+import time
+
+import pytest
+import requests
+
+from datastation.common.throttle import FixedWaitThrottle, TokenBucketThrottle, AimdThrottle, create_throttle
+
+
+def http_error(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    if headers is not None:
+        response.headers.update(headers)
+    return requests.HTTPError(response=response)
+
+
+class TestCreateThrottle:
+
+    def test_fixed_wait_by_default(self):
+        throttle = create_throttle(wait=2.0)
+        assert type(throttle) is FixedWaitThrottle
+        assert throttle.wait == 2.0
+
+    def test_rate_replaces_wait(self):
+        throttle = create_throttle(wait=2.0, rate=5)
+        assert type(throttle) is TokenBucketThrottle
+        assert throttle.rate == 5
+
+    def test_adaptive_uses_rate_as_maximum(self):
+        throttle = create_throttle(wait=2.0, rate=5, adaptive=True)
+        assert type(throttle) is AimdThrottle
+        assert throttle.max_rate == 5
+
+    def test_adaptive_without_rate_uses_wait(self):
+        throttle = create_throttle(wait=0.5, adaptive=True)
+        assert throttle.max_rate == 2.0
+
+
+class TestTokenBucketThrottle:
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucketThrottle(0)
+
+    def test_keeps_to_rate(self):
+        throttle = TokenBucketThrottle(rate=20)
+        start_time = time.monotonic()
+        for i in range(1, 6):
+            throttle.before_entry(i)
+        # the first token is available immediately, the other four take 1/20 second each
+        assert time.monotonic() - start_time >= 0.19
+
+
+class TestAimdThrottle:
+
+    def test_decreases_on_overload_status(self, caplog):
+        throttle = AimdThrottle(max_rate=10)
+        throttle.record(0.1)
+        throttle.record(0.1, http_error(503))
+        assert throttle.rate == 5
+        assert caplog.records[0].message == 'Lowering rate to 5.00 entries per second: server responded with 503'
+
+    def test_decreases_once_for_in_flight_entries(self):
+        throttle = AimdThrottle(max_rate=10)
+        throttle.record(0.1, http_error(429))
+        throttle.record(0.1, http_error(429))
+        assert throttle.rate == 5
+
+    def test_does_not_decrease_on_client_error(self):
+        throttle = AimdThrottle(max_rate=10)
+        throttle.record(0.1, http_error(404))
+        assert throttle.rate == 10
+
+    def test_decreases_on_high_latency(self):
+        throttle = AimdThrottle(max_rate=10)
+        throttle.record(0.1)
+        throttle.record(1.0)
+        assert throttle.rate == 5
+
+    def test_baseline_is_not_set_by_one_fast_entry(self, caplog):
+        throttle = AimdThrottle(max_rate=10)
+        throttle.record(0.5)
+        throttle.record(0.05)
+        rates = []
+        for _ in range(200):
+            # as if the entries were spread out in time, so that every overload would be reacted to
+            throttle.last_decrease = 0
+            throttle.record(0.5)
+            rates.append(throttle.rate)
+        assert throttle.get_baseline_latency() == 0.5
+        # at most a few decreases right after the fast entry, then the rate only goes up
+        assert len([message for message in caplog.messages if message.startswith('Lowering rate')]) <= 5
+        assert rates[10:] == sorted(rates[10:])
+        assert rates[-1] > rates[10]
+
+    def test_baseline_ignores_failed_entries(self):
+        throttle = AimdThrottle(max_rate=10)
+        throttle.record(0.5)
+        for _ in range(10):
+            throttle.record(0.01, http_error(404))
+        assert throttle.get_baseline_latency() == 0.5
+
+    def test_does_not_go_below_min_rate(self):
+        throttle = AimdThrottle(max_rate=10, min_rate=4)
+        throttle.record(0.1, http_error(503))
+        throttle.last_decrease = 0
+        throttle.record(0.1, http_error(503))
+        assert throttle.rate == 4
+
+    def test_increases_up_to_max_rate(self):
+        throttle = AimdThrottle(max_rate=10, additive_increase=1)
+        throttle.record(0.1, http_error(503))
+        throttle.record(0.1)
+        assert throttle.rate == 5.2
+        for _ in range(100):
+            throttle.record(0.1)
+        assert throttle.rate == 10
+
+    def test_pauses_on_retry_after(self):
+        throttle = AimdThrottle(max_rate=100)
+        throttle.record(0.01, http_error(429, {'Retry-After': '0.3'}))
+        start_time = time.monotonic()
+        throttle.before_entry(2)
+        assert time.monotonic() - start_time >= 0.25
@@ -0,0 +1,125 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+import requests
+
+from datastation.dataverse import user_import
+from datastation.dataverse.builtin_users import User
+from datastation.dataverse.user_import import PasswordUpdater, UserImport, UPDATE_PASSWORD_STATEMENT
+
+
+class FakeDatabase:
+
+    def __init__(self, usernames=()):
+        self.usernames = usernames
+        self.transactions = []
+        self.current = None
+
+    def stream(self, query):
+        return iter([(username.lower(),) for username in self.usernames])
+
+    @contextmanager
+    def transaction(self):
+        self.current = []
+        yield self
+        self.transactions.append(self.current)
+        self.current = None
+
+    def update_many(self, query, params_seq):
+        assert self.current is not None, "not in a transaction"
+        self.current.append((query, list(params_seq)))
+        return len(self.current[-1][1])
+
+
+def make_user(i):
+    return User(f'user{i}', 'A.', 'Jansen', f'user{i}@example.com', 'DANS', 'Tester', f'hash{i}')
+
+
+class TestPasswordUpdater:
+
+    def test_updates_in_batches(self):
+        database = FakeDatabase()
+        with PasswordUpdater(database, encryption_version=0, batch_size=2) as password_updater:
+            for i in range(5):
+                password_updater.add(make_user(i))
+        assert [len(transaction[0][1]) for transaction in database.transactions] == [2, 2, 1]
+        assert database.transactions[0] == [(UPDATE_PASSWORD_STATEMENT, [('hash0', 0, 'user0'), ('hash1', 0, 'user1')])]
+        assert password_updater.num_updated == 5
+        assert password_updater.num_batches == 3
+
+    def test_flushes_on_error(self):
+        database = FakeDatabase()
+        with pytest.raises(RuntimeError):
+            with PasswordUpdater(database, batch_size=10) as password_updater:
+                password_updater.add(make_user(1))
+                raise RuntimeError()
+        assert database.transactions == [[(UPDATE_PASSWORD_STATEMENT, [('hash1', 1, 'user1')])]]
+
+    def test_dry_run(self, capsys):
+        database = FakeDatabase()
+        with PasswordUpdater(database, batch_size=10, dry_run=True) as password_updater:
+            password_updater.add(make_user(1))
+        assert database.transactions == []
+        assert 'dry-run, not updating the passwords of 1 users' in capsys.readouterr().out
+
+
+class FakeBuiltInUsersApi:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.created = []
+
+    def create(self, user, send_email_notification=False, dry_run=False):
+        if user.username == 'unreachable':
+            raise requests.ConnectionError('connection refused')
+        r = requests.Response()
+        if user.username == 'invalid':
+            r.status_code = 400
+            r._content = b'{"message": "invalid user"}'
+        else:
+            r.status_code = 200
+            with self.lock:
+                self.created.append(user.username)
+        return r
+
+
+class FakeDataverseClient:
+    db_config = {}
+
+    def __init__(self):
+        self.api = FakeBuiltInUsersApi()
+
+    def built_in_users(self, builtin_users_key):
+        return self.api
+
+
+class TestUserImport:
+
+    def test_import_users(self, tmp_path, monkeypatch, capsys):
+        database = FakeDatabase(usernames=['User2'])
+
+        @contextmanager
+        def fake_database(config):
+            yield database
+
+        monkeypatch.setattr(user_import, 'Database', fake_database)
+        csv_file = tmp_path / 'users.csv'
+        csv_file.write_text('Username,GivenName,FamilyName,Email,Affiliation,Position,encryptedpassword\n' +
+                            ''.join(f'user{i},A.,Jansen,user{i}@example.com,DANS,Tester,hash{i}\n' for i in range(10)) +
+                            'invalid,A.,Jansen,x,DANS,Tester,hash\n'
+                            'unreachable,A.,Jansen,y,DANS,Tester,hash\n')
+        client = FakeDataverseClient()
+        UserImport(client, is_easy_format=False, builtin_users_key='key', batch_size=4,
+                   parallel=3).import_users(str(csv_file))
+
+        assert sorted(client.api.created) == sorted(f'user{i}' for i in range(10) if i != 2)
+        updated = [username for transaction in database.transactions for _, params_seq in transaction
+                   for _, _, username in params_seq]
+        assert sorted(updated) == sorted(client.api.created)
+        assert [len(transaction[0][1]) for transaction in database.transactions] == [4, 4, 1]
+        out = capsys.readouterr().out
+        assert 'User user2 exists already. Skipping it.' in out
+        assert 'connection refused' in out
+        assert ('Imported 9 users, 2 failed, 1 existed already; updated the passwords of 9 users in 3 batches'
+                in out)
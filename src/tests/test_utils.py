@@ -3,7 +3,8 @@ import argparse
 import unittest
 
 from datastation.common.utils import is_sub_path_of, has_dirtree_pred, set_permissions, positive_int_argument_converter, \
-    plural
+    plural, duration_argument_converter, add_batch_processor_args, batch_processor_kwargs
+from datastation.common.batch_processing import BatchProcessor, BatchProcessorWithReport
 
 
 class TestIsSubPathOf:
@@ -107,6 +108,44 @@ class TestPositiveIntArgumentConverter(unittest.TestCase):
             positive_int_argument_converter("abc")
 
 
+class TestDurationArgumentConverter(unittest.TestCase):
+    def test_duration_argument_converter(self):
+        self.assertEqual(duration_argument_converter("3600"), 3600)
+        self.assertEqual(duration_argument_converter("30s"), 30)
+        self.assertEqual(duration_argument_converter("90m"), 5400)
+        self.assertEqual(duration_argument_converter("1.5h"), 5400)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            duration_argument_converter("0")
+        with self.assertRaises(argparse.ArgumentTypeError):
+            duration_argument_converter("6d")
+        with self.assertRaises(argparse.ArgumentTypeError):
+            duration_argument_converter("")
+
+
+class TestBatchProcessorKwargs(unittest.TestCase):
+    def test_batch_processor_kwargs(self):
+        parser = argparse.ArgumentParser()
+        add_batch_processor_args(parser)
+        args = parser.parse_args(['--parallel', '4', '--max-attempts', '3', '--entry-timeout', '2m'])
+        kwargs = batch_processor_kwargs(args)
+        self.assertEqual(kwargs['parallel'], 4)
+        self.assertEqual(kwargs['max_attempts'], 3)
+        self.assertEqual(kwargs['entry_timeout'], 120)
+        self.assertFalse(kwargs['resume'])
+        self.assertFalse(kwargs['fail_on_first_error'])
+        batch_processor = BatchProcessorWithReport(headers=['PID', 'Status'], **kwargs)
+        self.assertEqual(batch_processor.parallel, 4)
+
+    def test_batch_processor_kwargs_without_report(self):
+        parser = argparse.ArgumentParser()
+        add_batch_processor_args(parser, report=False)
+        args = parser.parse_args(['-w', '0'])
+        kwargs = batch_processor_kwargs(args, report=False, fail_on_first_error=True)
+        self.assertNotIn('report_file', kwargs)
+        self.assertTrue(kwargs['fail_on_first_error'])
+        self.assertEqual(BatchProcessor(**kwargs).wait, 0)
+
+
 class TestPlural(unittest.TestCase):
     def test_plural(self):
         self.assertEqual(plural("pid"), "pids")
@@ -8,14 +8,14 @@ from datastation.dans_bag.validate_dans_bag import ValidateDansBag
 class TestValidateDansBag:
 
     def test_post_not_called_when_dry_run(self):
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config)
             validator.validate_dans_bag('some/path', 'SIP', None, dry_run=True)
             mock_post.assert_not_called()
 
     def test_post_called_when_not_dry_run(self):
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.text = '{}'
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config)
@@ -23,7 +23,7 @@ class TestValidateDansBag:
             mock_post.assert_called_once()
 
     def test_post_called_with_expected_url(self):
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.text = '{}'
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config)
@@ -32,7 +32,7 @@ class TestValidateDansBag:
                                               headers=mock_post.call_args[1]['headers'])
 
     def test_raises_exception_when_accept_type_is_unknown(self):
-        with patch('requests.post'):
+        with patch('requests.Session.post'):
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config, accept_type='unknown')
             try:
@@ -43,7 +43,7 @@ class TestValidateDansBag:
                 assert False, "Exception expected"
 
     def test_post_called_with_expected_headers(self):
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.text = '{}'
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config)
@@ -51,7 +51,7 @@ class TestValidateDansBag:
             assert mock_post.call_args[1]['headers']['Accept'] == 'application/json'
 
     def test_command_contains_bag_location(self):
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.text = '{}'
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config)
@@ -60,7 +60,7 @@ class TestValidateDansBag:
             assert 'some/path' in mock_post.call_args[1]['data']
 
     def test_json_used_for_loading_result_when_accept_type_is_json(self):
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.text = '{"some": "json"}'
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config, accept_type='application/json')
@@ -70,7 +70,7 @@ class TestValidateDansBag:
                 mock_json_loads.assert_called_once_with('{"some": "json"}')
 
     def test_yaml_used_for_loading_result_when_accept_type_is_yaml(self):
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.text = 'some: yaml'
             config = {'service_baseurl': 'http://service-base-url'}
             validator = ValidateDansBag(config, accept_type='text/plain')